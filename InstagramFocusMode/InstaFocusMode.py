@@ -1,87 +1,2038 @@
+import os
 import sys
+import time
+
+# Third-party modules this script needs, and the pip package providing each
+REQUIRED_PACKAGES = {
+    "psutil": "psutil",
+    "PIL": "pillow",
+}
+# Written once the modules above were found, so later launches skip looking for them
+DEPS_MARKER = os.path.join(os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                           or os.path.expanduser("~/.cache"), "InstaFocusMode", "deps-verified")
+
 
-# List of required modules
-required_modules = [
-    "os",
-    "shutil",
-    "win32com.client",
-    "tkinter",
-    "threading",
-    "time",
-    "psutil",
-    "requests",
-    "subprocess",
-    "platform",
-    "PIL"
-]
-
-missing = []
-for mod in required_modules:
+def verify_dependencies():
+    """Install missing packages and restart; a no-op once the marker matches this interpreter"""
+    key = f"{sys.executable} {sys.version_info[0]}.{sys.version_info[1]} {' '.join(sorted(REQUIRED_PACKAGES))}"
     try:
-        if mod == "PIL":
-            import PIL
-        elif mod == "win32com.client":
-            import win32com.client
-        elif mod == "tkinter":
-            import tkinter
-        else:
-            __import__(mod)
-    except ImportError:
-        missing.append(mod)
+        with open(DEPS_MARKER, 'r', encoding='utf-8') as f:
+            if f.read() == key:
+                return
+    except OSError:
+        pass
 
-if missing:
-    import subprocess
-    import sys
+    # find_spec only locates the modules, without the cost of importing them
+    import importlib.util
+    missing = [package for module, package in REQUIRED_PACKAGES.items()
+               if importlib.util.find_spec(module) is None]
+    # The headless monitor (--daemon, --ctl) runs without Tk
+    headless = "--daemon" in sys.argv or "--ctl" in sys.argv
+    has_tk = importlib.util.find_spec("tkinter") is not None
+    if not has_tk and not headless:
+        print("tkinter is missing; install your system's Python Tk package (e.g. python3-tk)")
+        sys.exit(1)
+    if missing:
+        import subprocess
+        print("Installing missing dependencies:", missing)
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *missing])
+        # Restart the script
+        os.execl(sys.executable, sys.executable, *sys.argv)
+    if not has_tk:
+        return
 
-    # Map module names to pip install names
-    pip_names = {
-        "win32com.client": "pywin32",
-        "psutil": "psutil",
-        "PIL": "pillow"
-    }
-    to_install = []
-    for mod in missing:
-        if mod in pip_names:
-            to_install.append(pip_names[mod])
-        else:
-            to_install.append(mod)
+    try:
+        os.makedirs(os.path.dirname(DEPS_MARKER), exist_ok=True)
+        with open(DEPS_MARKER, 'w', encoding='utf-8') as f:
+            f.write(key)
+    except OSError:
+        pass
 
-    print("Installing missing dependencies:", to_install)
-    subprocess.check_call([sys.executable, "-m", "pip", "install", *to_install])
-    # Restart the script
-    os.execl(sys.executable, sys.executable, *sys.argv)
 
-import os
-import shutil
-import win32com.client
-import tkinter as tk
-from tkinter import ttk
+verify_dependencies()
+
+try:
+    import tkinter as tk
+    from tkinter import ttk
+except ImportError:
+    tk = ttk = None
 import threading
-import time
+import concurrent.futures
+import socket
+# asyncio, sqlite3, statistics and the modules only the daemon and the benchmarks
+# use are imported by the functions needing them, to keep the window's start quick
 import psutil
 import subprocess
 import platform
-from PIL import Image, ImageTk, ImageDraw
-import io
+import select
+import re
+import json
+import datetime
+import queue
+import math
+from collections import deque
+
+# Event-driven active window detection on X11 (optional, falls back to polling).
+# python-xlib is imported by load_xlib() the first time it is needed.
+xdisplay = None
+
+
+def load_xlib():
+    """Import python-xlib on first use; False when it is not installed"""
+    global X, Xatom, xdisplay, XError
+    if xdisplay is None:
+        try:
+            from Xlib import X, Xatom, display as xdisplay
+            from Xlib.error import XError
+        except ImportError:
+            return False
+    return True
+
+# Longest time between two looks at the active window, even without events
+RECHECK_INTERVAL = 2.0
+# Running processes are listed when the active window changes, otherwise at this interval
+PROCESS_SCAN_INTERVAL = 10.0
+# Pause after an unexpected error in the monitoring loop, so a persistent fault does not spin
+MONITOR_ERROR_BACKOFF = 5.0
+# Blocklist rules (see Readme); without this file only Instagram is blocked
+RULES_FILE = os.environ.get("FOCUS_RULES_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "focus_rules.json")
+# Detections and dismissals, for the --ctl report rollups
+TELEMETRY_FILE = os.environ.get("FOCUS_TELEMETRY_FILE") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"),
+    "InstaFocusMode", "telemetry.sqlite3")
+
+
+class X11WindowWatcher:
+    """Follow the active window through X11 property notifications.
+
+    One persistent connection listens for PropertyNotify on the root window
+    (``_NET_ACTIVE_WINDOW``) and on the active window itself (its title, which
+    changes when a browser switches tabs), so the monitor sleeps in select()
+    until something actually changes instead of spawning xdotool every tick.
+    """
+
+    name = "x11-events"
+
+    def __init__(self, display_name=None):
+        if not load_xlib():
+            raise RuntimeError("python-xlib is not installed")
+        self.display = xdisplay.Display(display_name)
+        # Windows can disappear before we stop watching them; ignore those async errors
+        self.display.set_error_handler(lambda *args: None)
+        self.root = self.display.screen().root
+        self.NET_ACTIVE_WINDOW = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        self.NET_WM_NAME = self.display.intern_atom('_NET_WM_NAME')
+        self.UTF8_STRING = self.display.intern_atom('UTF8_STRING')
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        self.window = None
+        self.title = self.read_title()
+
+    def read_title(self):
+        """Look up the active window and its title, watching it for title changes"""
+        prop = self.root.get_full_property(self.NET_ACTIVE_WINDOW, X.AnyPropertyType)
+        window_id = prop.value[0] if prop is not None and len(prop.value) else 0
+        if not window_id:
+            self.window = None
+            return ""
+        if self.window is None or self.window.id != window_id:
+            if self.window is not None:
+                self.window.change_attributes(event_mask=X.NoEventMask)
+            self.window = self.display.create_resource_object('window', window_id)
+            self.window.change_attributes(event_mask=X.PropertyChangeMask)
+        try:
+            prop = self.window.get_full_property(self.NET_WM_NAME, self.UTF8_STRING)
+            if prop is not None:
+                return prop.value.decode('utf-8', 'replace')
+            name = self.window.get_wm_name() or ""
+            return name.decode('latin-1') if isinstance(name, bytes) else name
+        except XError:
+            self.window = None
+            return ""
+
+    def is_title_change(self, event):
+        if event.type != X.PropertyNotify:
+            return False
+        if event.atom == self.NET_ACTIVE_WINDOW:
+            return True
+        return (self.window is not None and event.window.id == self.window.id
+                and event.atom in (self.NET_WM_NAME, Xatom.WM_NAME))
+
+    def wait(self, timeout):
+        """Sleep until the active window or its title changes, or timeout; returns the title"""
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = False
+            while self.display.pending_events():
+                if self.is_title_change(self.display.next_event()):
+                    changed = True
+            if changed:
+                self.title = self.read_title()
+                return self.title
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self.title
+            select.select([self.display], [], [], remaining)
+
+    def close(self):
+        self.display.close()
+
+
+class PollingWindowWatcher:
+    """Poll the active window title, quickly after a change and more slowly while idle.
+
+    The interval starts at ``min_interval``, grows by ``backoff`` on every
+    poll that sees the same title and drops back to ``min_interval`` as soon
+    as the title changes, so switching windows is noticed quickly without
+    paying for fast polling while the user stays put.
+    """
+
+    name = "polling"
+
+    def __init__(self, probe, min_interval=0.25, max_interval=RECHECK_INTERVAL, backoff=1.5):
+        self.probe = probe
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.title = probe()
+
+    def wait(self, timeout):
+        """Sleep for the current interval (at most timeout) and return the title"""
+        time.sleep(min(self.interval, timeout))
+        title = self.probe()
+        if title != self.title:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self.title = title
+        return title
+
+    def close(self):
+        pass
+
+
+def create_window_watcher(probe):
+    """Use X11 events when they are available here, else adaptive polling of probe"""
+    uses_helper = bool(os.environ.get("FOCUS_WINDOW_HELPER"))
+    if platform.system() == "Linux" and os.environ.get("DISPLAY") and not uses_helper and load_xlib():
+        try:
+            return X11WindowWatcher()
+        except Exception as e:
+            print(f"X11 events unavailable, polling instead: {e}")
+    return PollingWindowWatcher(probe)
+
+
+class X11TitleDriver:
+    """Benchmark helper: switch _NET_ACTIVE_WINDOW between test windows on the X display"""
+
+    def __init__(self, titles):
+        self.display = xdisplay.Display()
+        screen = self.display.screen()
+        self.root = screen.root
+        self.NET_ACTIVE_WINDOW = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        net_wm_name = self.display.intern_atom('_NET_WM_NAME')
+        utf8_string = self.display.intern_atom('UTF8_STRING')
+        self.windows = []
+        for title in titles:
+            window = self.root.create_window(0, 0, 10, 10, 0, screen.root_depth)
+            window.set_wm_name(title)
+            window.change_property(net_wm_name, utf8_string, 8, title.encode('utf-8'))
+            self.windows.append(window)
+        self.display.sync()
+
+    def activate(self, index):
+        self.root.change_property(self.NET_ACTIVE_WINDOW, Xatom.WINDOW, 32, [self.windows[index].id])
+        self.display.flush()
+
+    def close(self):
+        for window in self.windows:
+            window.destroy()
+        self.display.close()
+
+
+class SimulatedTitleDriver:
+    """Benchmark helper: a desktop whose active window title is just a variable"""
+
+    def __init__(self, titles):
+        self.titles = titles
+        self.title = titles[0]
+
+    def activate(self, index):
+        self.title = self.titles[index]
+
+    def probe(self):
+        return self.title
+
+    def close(self):
+        pass
+
+
+def children_cpu_time():
+    """CPU seconds used by finished child processes (xdotool, powershell, ...)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def benchmark_detection(switches=20, idle_seconds=5.0):
+    """Report detection latency and idle CPU use of each active-window backend"""
+    import random
+    import statistics
+    titles = ("Notes - Focus Benchmark", "Instagram - Focus Benchmark")
+    backends = []
+    if os.environ.get("DISPLAY") and load_xlib():
+        # A monitor that is never started, only for its platform probes
+        monitor = FocusMonitor()
+        backends.append(("x11-events", X11TitleDriver, lambda driver: X11WindowWatcher()))
+        backends.append(("polling (xdotool)", X11TitleDriver,
+                         lambda driver: PollingWindowWatcher(monitor.get_active_window_title)))
+    else:
+        print("No X11 display or python-xlib: measuring the polling backend on a simulated desktop only")
+    backends.append(("polling (simulated)", SimulatedTitleDriver,
+                     lambda driver: PollingWindowWatcher(driver.probe)))
+
+    for label, make_driver, make_watcher in backends:
+        driver = make_driver(titles)
+        driver.activate(0)
+        watcher = make_watcher(driver)
+        state = {'title': watcher.title, 'time': 0.0}
+        changed = threading.Event()
+        stop = threading.Event()
+
+        def watch():
+            while not stop.is_set():
+                title = watcher.wait(RECHECK_INTERVAL)
+                if title != state['title']:
+                    state['title'], state['time'] = title, time.perf_counter()
+                    changed.set()
+
+        thread = threading.Thread(target=watch, daemon=True)
+        thread.start()
+        try:
+            # Idle: nothing changes, so any CPU used is the cost of watching
+            cpu_start, children_start = time.process_time(), children_cpu_time()
+            time.sleep(idle_seconds)
+            idle_cpu = (time.process_time() - cpu_start) + (children_cpu_time() - children_start)
+
+            latencies = []
+            missed = 0
+            for i in range(switches):
+                index = (i + 1) % 2
+                changed.clear()
+                start = time.perf_counter()
+                driver.activate(index)
+                while state['title'] != titles[index]:
+                    if not changed.wait(5):
+                        break
+                    changed.clear()
+                if state['title'] == titles[index]:
+                    latencies.append((state['time'] - start) * 1000)
+                else:
+                    missed += 1
+                time.sleep(random.uniform(0.2, 1.0))
+        finally:
+            stop.set()
+            thread.join()
+            watcher.close()
+            driver.close()
+
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{label:>22}: detection latency median {statistics.median(latencies):7.1f} ms, "
+                  f"p95 {p95:7.1f} ms, missed {missed}/{switches}; "
+                  f"idle CPU {idle_cpu * 1000:6.1f} ms over {idle_seconds:.0f} s "
+                  f"({idle_cpu / idle_seconds * 100:.2f}%)")
+        else:
+            print(f"{label:>22}: no switches detected")
+
+
+# Window helpers: one long-lived process per platform, queried over its stdin/stdout.
+# Every request is one line ("title", "processes", "ping" or "quit") and gets one line back.
+WINDOWS_HELPER_SCRIPT = r'''
+Add-Type @"
+using System;
+using System.Runtime.InteropServices;
+using System.Text;
+public class FocusWin32 {
+    [DllImport("user32.dll")]
+    public static extern IntPtr GetForegroundWindow();
+    [DllImport("user32.dll", CharSet = CharSet.Unicode)]
+    public static extern int GetWindowText(IntPtr hWnd, StringBuilder text, int count);
+}
+"@
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$text = New-Object System.Text.StringBuilder 512
+while (($line = [Console]::In.ReadLine()) -ne $null) {
+    switch ($line) {
+        'title' {
+            [void]$text.Clear()
+            [void][FocusWin32]::GetWindowText([FocusWin32]::GetForegroundWindow(), $text, $text.Capacity)
+            $reply = $text.ToString()
+        }
+        'processes' { $reply = (Get-Process | ForEach-Object { $_.ProcessName }) -join "`t" }
+        'ping' { $reply = 'pong' }
+        'quit' { exit }
+        default { $reply = '' }
+    }
+    [Console]::Out.WriteLine(($reply -replace "[\r\n]", ' '))
+    [Console]::Out.Flush()
+}
+'''
+
+MACOS_HELPER_SCRIPT = r'''
+ObjC.import('Foundation');
+var input = $.NSFileHandle.fileHandleWithStandardInput;
+var output = $.NSFileHandle.fileHandleWithStandardOutput;
+var events = Application('System Events');
+function answer(request) {
+    if (request === 'title') {
+        try {
+            return events.processes.whose({frontmost: true})[0].windows[0].name();
+        } catch (e) {
+            return '';
+        }
+    }
+    if (request === 'processes') {
+        return events.processes.name().join('\t');
+    }
+    return request === 'ping' ? 'pong' : '';
+}
+var buffer = '';
+var running = true;
+while (running) {
+    var data = input.availableData;
+    if (data.length === 0) {
+        break;
+    }
+    buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    var lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (var i = 0; i < lines.length && running; i++) {
+        if (lines[i] === 'quit') {
+            running = false;
+        } else {
+            var reply = String(answer(lines[i])).replace(/[\r\n]/g, ' ') + '\n';
+            output.writeData($(reply).dataUsingEncoding($.NSUTF8StringEncoding));
+        }
+    }
+}
+'''
+
+# Speaks the same protocol on any platform. The title is read from the file named by
+# FOCUS_FAKE_TITLE_FILE on every request, so tests can switch windows by rewriting it.
+FAKE_HELPER_SCRIPT = r'''
+import os, sys
+for line in sys.stdin:
+    request = line.strip()
+    if request == "quit":
+        break
+    if request == "title":
+        try:
+            with open(os.environ["FOCUS_FAKE_TITLE_FILE"], encoding="utf-8") as f:
+                reply = f.read()
+        except (KeyError, OSError):
+            reply = "Fake Window"
+    elif request == "processes":
+        reply = os.environ.get("FOCUS_FAKE_PROCESSES", "")
+    else:
+        reply = "pong" if request == "ping" else ""
+    sys.stdout.write(reply.replace("\r", " ").replace("\n", " ") + "\n")
+    sys.stdout.flush()
+'''
+
+
+def helper_command(kind):
+    """Command line that starts the window helper of the given kind"""
+    import base64
+    if kind == "windows":
+        encoded = base64.b64encode(WINDOWS_HELPER_SCRIPT.encode('utf-16-le')).decode('ascii')
+        return ['powershell', '-NoProfile', '-NonInteractive', '-EncodedCommand', encoded]
+    if kind == "macos":
+        return ['osascript', '-l', 'JavaScript', '-e', MACOS_HELPER_SCRIPT]
+    if kind == "fake":
+        return [sys.executable, '-c', FAKE_HELPER_SCRIPT]
+    raise ValueError(f"Unknown window helper: {kind}")
+
+
+class WindowHelper:
+    """A long-lived helper process answering window queries over a line protocol.
+
+    The helper is started on first use and then costs one pipe round trip
+    per query instead of a PowerShell or osascript launch. If it exits or
+    does not answer within ``timeout`` it is killed and a fresh one is
+    started on the next query.
+    """
+
+    def __init__(self, command, timeout=3.0):
+        self.command = command
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.process = None
+        self.replies = None
+        self.starts = 0
+
+    def start(self):
+        flags = subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, encoding='utf-8',
+                                        errors='replace', bufsize=1, creationflags=flags)
+        self.replies = queue.Queue()
+        threading.Thread(target=self.read_replies, args=(self.process, self.replies), daemon=True).start()
+        self.starts += 1
+
+    @staticmethod
+    def read_replies(process, replies):
+        for line in process.stdout:
+            replies.put(line.rstrip("\r\n"))
+        replies.put(None)
+
+    def query(self, request):
+        """Send one request and return the helper's one-line reply ('' on failure)"""
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self.start()
+            try:
+                self.process.stdin.write(request + "\n")
+                self.process.stdin.flush()
+                reply = self.replies.get(timeout=self.timeout)
+            except (OSError, ValueError, queue.Empty):
+                reply = None
+            if reply is None:
+                # Dead or hung: the next query starts a fresh helper
+                self.kill()
+                return ""
+            return reply
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def close(self):
+        """Ask the helper to exit, killing it if it does not"""
+        with self.lock:
+            if self.process is None:
+                return
+            try:
+                self.process.stdin.write("quit\n")
+                self.process.stdin.close()
+                self.process.wait(timeout=1)
+                self.process = None
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                self.kill()
+
+
+def benchmark_window_helper(queries=200):
+    """Compare a persistent helper with launching a process per query, using the fake helper"""
+    import statistics
+    command = helper_command("fake")
+
+    def report(label, timings):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{label:>20}: median {statistics.median(timings):8.3f} ms, p95 {p95:8.3f} ms")
+
+    helper = WindowHelper(command)
+    helper.query("ping")
+    timings = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        helper.query("title")
+        timings.append((time.perf_counter() - start) * 1000)
+    report("persistent helper", timings)
+
+    # Recovery: the helper is restarted transparently after it dies
+    helper.process.kill()
+    helper.process.wait()
+    start = time.perf_counter()
+    reply = helper.query("ping")
+    print(f"{'restart after crash':>20}: {(time.perf_counter() - start) * 1000:8.3f} ms "
+          f"(reply {reply!r}, {helper.starts} starts)")
+    helper.close()
+
+    timings = []
+    for _ in range(max(1, queries // 10)):
+        start = time.perf_counter()
+        subprocess.run(command, input="title\n", capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    report("process per query", timings)
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton: every keyword occurring in a text, in one pass over the text.
+
+    Matching costs O(len(text)) whatever the number of keywords, which is
+    what keeps rule evaluation flat as the blocklist grows.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        outputs = [set()]
+        for keyword, value in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword.lower():
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(value)
+
+        # Breadth-first, so every state's failure link is final before its children need it
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for ch, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                outputs[next_state] |= outputs[self.fail[next_state]]
+        self.outputs = [frozenset(values) for values in outputs]
+
+    def search(self, text):
+        """Return the values of all keywords found in text, ignoring case"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set()
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def parse_days(spec):
+    """Weekday numbers for 'mon-fri', 'sat,sun', a list of names or 'daily'"""
+    if not spec or spec == "daily":
+        return set(range(7))
+    parts = spec if isinstance(spec, list) else spec.split(",")
+    days = set()
+    for part in parts:
+        first, _, last = part.strip().lower().partition("-")
+        start = WEEKDAYS.index(first[:3])
+        end = WEEKDAYS.index(last[:3]) if last else start
+        days.update(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return days
+
+
+def parse_clock(text):
+    """Minutes since midnight for 'HH:MM'"""
+    hours, _, minutes = text.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class FocusRule:
+    """One blocked target: process name and window title substrings, title regexes and when it applies"""
+
+    def __init__(self, name, processes=(), titles=(), title_patterns=(), schedule=()):
+        self.name = name
+        self.processes = list(processes)
+        self.titles = list(titles)
+        self.title_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in title_patterns]
+        # (weekdays, start minute, end minute); an end before the start runs past midnight
+        self.schedule = [(parse_days(window.get("days")), parse_clock(window.get("start", "00:00")),
+                          parse_clock(window.get("end", "24:00")))
+                         for window in schedule]
+
+    def is_active(self, now):
+        if not self.schedule:
+            return True
+        minute = now.hour * 60 + now.minute
+        today = now.weekday()
+        for days, start, end in self.schedule:
+            if start <= end:
+                if today in days and start <= minute < end:
+                    return True
+            elif (today in days and minute >= start) or ((today - 1) % 7 in days and minute < end):
+                return True
+        return False
+
+
+class RuleSet:
+    """Blocklist rules compiled for single-pass matching.
+
+    Process name and window title substrings go into one Aho-Corasick
+    automaton each, so their cost does not depend on the number of rules.
+    Title regexes are joined into one alternation that is searched once; only
+    when it hits are the individual patterns checked to find the rules.
+    """
+
+    def __init__(self, rules, intervention=None):
+        self.rules = rules
+        # The file's "intervention" section, for InterventionScheduler.from_config
+        self.intervention = intervention or {}
+        self.process_matcher = AhoCorasick(
+            (pattern, index) for index, rule in enumerate(rules) for pattern in rule.processes)
+        self.title_matcher = AhoCorasick(
+            (pattern, index) for index, rule in enumerate(rules) for pattern in rule.titles)
+        self.title_regexes = [(index, regex) for index, rule in enumerate(rules) for regex in rule.title_patterns]
+        self.title_gate = None
+        if self.title_regexes:
+            self.title_gate = re.compile("|".join(f"(?:{regex.pattern})" for _, regex in self.title_regexes),
+                                         re.IGNORECASE)
+
+    @classmethod
+    def default(cls):
+        return cls([FocusRule("Instagram", processes=["instagram"], titles=["instagram"])])
+
+    @classmethod
+    def load(cls, path):
+        """Read a JSON rules file; without one, only Instagram is blocked"""
+        if not path or not os.path.exists(path):
+            return cls.default()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rules = []
+        for entry in data.get("rules", []):
+            try:
+                rules.append(FocusRule(entry["name"], entry.get("processes", ()), entry.get("titles", ()),
+                                       entry.get("title_patterns", ()), entry.get("schedule", ())))
+            except (KeyError, ValueError, re.error) as e:
+                raise ValueError(f"Invalid rule {entry.get('name', entry)!r} in {path}: {e}")
+        return cls(rules, data.get("intervention"))
+
+    def match_process(self, name):
+        """Indexes of the rules whose process patterns occur in a process name"""
+        return frozenset(self.process_matcher.search(name))
+
+    def match_title(self, title):
+        """Indexes of the rules whose title patterns match a window title"""
+        found = self.title_matcher.search(title)
+        if self.title_gate is not None and self.title_gate.search(title):
+            found.update(index for index, regex in self.title_regexes if regex.search(title))
+        return found
+
+    def active(self, indexes, now=None):
+        """Names of the matched rules whose schedule applies now"""
+        now = now or datetime.datetime.now()
+        return [self.rules[index].name for index in sorted(indexes) if self.rules[index].is_active(now)]
+
+
+def benchmark_rules(counts=(1, 10, 100, 1000), repeat=2000):
+    """Show that matching cost stays flat as the number of rules grows"""
+    titles = ["main.py - Visual Studio Code", "Inbox (3) - Mail", "site42.example - Firefox",
+              "Terminal", "Instagram - Google Chrome", "Quarterly report.xlsx - Excel"]
+    names = ["python3", "code", "chrome.exe", "firefox", "bash", "systemd", "app7-helper", "Xorg"]
+    print(f"{'rules':>6} {'compile ms':>11} {'title us':>9} {'process us':>11} {'naive title us':>15}")
+    for count in counts:
+        rules = [FocusRule(f"Rule {i}", processes=[f"app{i}-"], titles=[f"site{i}.example"]) for i in range(count)]
+        start = time.perf_counter()
+        rule_set = RuleSet(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            rule_set.match_title(titles[i % len(titles)])
+        title_us = (time.perf_counter() - start) / repeat * 1e6
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            rule_set.match_process(names[i % len(names)])
+        process_us = (time.perf_counter() - start) / repeat * 1e6
+
+        # The hard-coded approach scaled up: one substring test per pattern
+        patterns = [pattern for rule in rules for pattern in rule.titles]
+        start = time.perf_counter()
+        for i in range(repeat):
+            lowered = titles[i % len(titles)].lower()
+            [pattern for pattern in patterns if pattern in lowered]
+        naive_us = (time.perf_counter() - start) / repeat * 1e6
+        print(f"{count:>6} {compile_ms:>11.2f} {title_us:>9.2f} {process_us:>11.2f} {naive_us:>15.2f}")
+
+
+class ProcessTracker:
+    """Incrementally tracked process list with a cached verdict per process.
+
+    Each scan reads only the PIDs and their start times; the name of a
+    process is looked up and matched once with ``matcher`` (a process name
+    to set of rule indexes function, see RuleSet.match_process) the first
+    time its (PID, start time) pair is seen. PIDs that vanished are dropped,
+    and a PID reused by a new process is examined again because its start
+    time differs. On Linux the start time comes straight from
+    ``/proc/<pid>/stat``; elsewhere one ``process_iter(['create_time'])``
+    pass reads them all, with psutil keeping its Process objects between
+    scans. Either way a scan still touches every process once, but only for
+    its start time, not its name. ``source`` provides ``pids()``,
+    ``process_iter()`` and ``Process(pid)``: psutil, or a SyntheticDesktop
+    in benchmarks.
+    """
+
+    def __init__(self, matcher, source=psutil):
+        self.matcher = matcher
+        self.source = source
+        self.proc_stat = source is psutil and os.path.exists("/proc/self/stat")
+        self.cache = {}
+        self.matched = set()
+        self.scans = 0
+        self.examined = 0
+        self.last_scan_ms = 0.0
+        self.total_scan_ms = 0.0
+
+    def start_times(self):
+        """Start time of every running process by PID, in a unit that only needs to be compared"""
+        if not self.proc_stat:
+            # An unreadable start time comes back as None; it still identifies nothing, so use 0
+            return {proc.pid: proc.info['create_time'] or 0.0
+                    for proc in self.source.process_iter(['create_time'])}
+        times = {}
+        for pid in self.source.pids():
+            try:
+                with open(f"/proc/{pid}/stat", 'rb') as f:
+                    # starttime is field 22; fields are counted after the command name,
+                    # which may itself contain spaces and parentheses
+                    times[pid] = int(f.read().rsplit(b')', 1)[1].split()[19])
+            except (OSError, IndexError, ValueError):
+                continue
+        return times
+
+    def examine(self, pid, started):
+        """Read and match one new process; returns False if it is already gone"""
+        try:
+            proc = self.source.Process(pid)
+            with proc.oneshot():
+                name = proc.name()
+        except psutil.AccessDenied:
+            # Not readable now, so not readable next tick either: remember that
+            name = ""
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            self.cache.pop(pid, None)
+            self.matched.discard(pid)
+            return False
+        matched = self.matcher(name) if name else frozenset()
+        self.cache[pid] = (started, name, matched)
+        if matched:
+            self.matched.add(pid)
+        else:
+            self.matched.discard(pid)
+        self.examined += 1
+        return True
+
+    def scan(self):
+        """Update the cache and return the indexes of the rules matched by running processes"""
+        start = time.perf_counter()
+        times = self.start_times()
+        for pid in self.cache.keys() - times.keys():
+            del self.cache[pid]
+            self.matched.discard(pid)
+        for pid, started in times.items():
+            cached = self.cache.get(pid)
+            if cached is None or cached[0] != started:
+                self.examine(pid, started)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.scans += 1
+        self.last_scan_ms = elapsed
+        self.total_scan_ms += elapsed
+        found = set()
+        for pid in self.matched:
+            found |= self.cache[pid][2]
+        return found
+
+    def stats(self):
+        """Scan counters: scans, processes examined, cache size and scan times in ms"""
+        return {
+            'scans': self.scans,
+            'examined': self.examined,
+            'tracked': len(self.cache),
+            'matched': len(self.matched),
+            'last_scan_ms': self.last_scan_ms,
+            'mean_scan_ms': self.total_scan_ms / self.scans if self.scans else 0.0,
+        }
+
+
+def benchmark_process_scan(ticks=50):
+    """Compare a full process_iter pass per tick with the incremental tracker"""
+    import statistics
+    timings = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        for proc in psutil.process_iter(['pid', 'name']):
+            if 'instagram' in (proc.info['name'] or '').lower():
+                break
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{'process_iter':>20}: median {statistics.median(timings):8.3f} ms per tick "
+          f"({len(psutil.pids())} processes)")
+
+    tracker = ProcessTracker(RuleSet.default().match_process)
+    timings = []
+    for _ in range(ticks):
+        tracker.scan()
+        timings.append(tracker.last_scan_ms)
+    stats = tracker.stats()
+    print(f"{'ProcessTracker':>20}: median {statistics.median(timings):8.3f} ms per tick "
+          f"(first scan {timings[0]:.3f} ms, {stats['examined']} processes examined in {stats['scans']} scans)")
+
+
+# Overlay animation: the robot bobs up and down once per BOB_PERIOD, redrawn OVERLAY_FPS times a second
+OVERLAY_FPS = 30
+BOB_PERIOD = 1.5
+BOB_HEIGHT = 3
+SUPERSAMPLE = 2
+# First line of the overlay message, by escalation level
+OVERLAY_HEADLINES = ["🚫 FOCUS TIME! 🚫", "⚠️ STILL HERE? ⚠️", "⛔ LAST WARNING ⛔"]
+
+
+def format_wait(seconds):
+    """'1 minute', '90 seconds', '5 minutes'"""
+    if seconds % 60:
+        return f"{seconds:.0f} seconds"
+    minutes = int(seconds // 60)
+    return "1 minute" if minutes == 1 else f"{minutes} minutes"
+
+
+def render_character_frames(screen_width, screen_height):
+    """Render the robot and speech bubble with PIL, once per distinct bob offset.
+
+    Returns (left, top, images, sequence): where the images go on the
+    canvas, one image per offset, and for every animation frame the index
+    of the image to show. Shapes are drawn at SUPERSAMPLE times the size
+    and scaled down, which smooths their edges.
+    """
+    # Pillow is only needed once an overlay is shown, so it is not imported at startup
+    from PIL import Image, ImageDraw
+
+    char_x = screen_width // 4
+    char_y = screen_height // 2
+    bubble_x = char_x + 100
+    bubble_y = char_y - 80
+    left = char_x - 64
+    top = min(char_y - 104, bubble_y - 64) - BOB_HEIGHT
+    right = bubble_x + 254
+    bottom = char_y + 54
+    s = SUPERSAMPLE
+
+    def box(x0, y0, x1, y1, dy=0):
+        return [(x0 - left) * s, (y0 - top + dy) * s, (x1 - left) * s, (y1 - top + dy) * s]
+
+    def draw_scene(dy):
+        image = Image.new('RGBA', ((right - left) * s, (bottom - top) * s), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        # Speech bubble and pointer stay put; the message is drawn on top of them by Tk
+        draw.ellipse(box(bubble_x - 10, bubble_y - 60, bubble_x + 250, bubble_y + 50),
+                     fill='white', outline='#2E7D32', width=3 * s)
+        pointer = [(char_x + 60, char_y - 60 + dy), (bubble_x - 10, bubble_y - 10), (bubble_x - 10, bubble_y + 10)]
+        draw.polygon([((x - left) * s, (y - top) * s) for x, y in pointer],
+                     fill='white', outline='#2E7D32', width=2 * s)
+        # Body, head, eyes, arms and legs
+        draw.rectangle(box(char_x - 40, char_y - 60, char_x + 40, char_y + 20, dy),
+                       fill='#4CAF50', outline='#2E7D32', width=3 * s)
+        draw.ellipse(box(char_x - 30, char_y - 100, char_x + 30, char_y - 40, dy),
+                     fill='#66BB6A', outline='#2E7D32', width=3 * s)
+        for eye_x in (char_x - 15, char_x + 15):
+            draw.ellipse(box(eye_x - 5, char_y - 85, eye_x + 5, char_y - 75, dy), fill='white', outline='black')
+            draw.ellipse(box(eye_x - 3, char_y - 83, eye_x + 3, char_y - 77, dy), fill='black')
+        for x0, y0, x1, y1 in ((char_x - 60, char_y - 40, char_x - 40, char_y - 10),
+                               (char_x + 40, char_y - 40, char_x + 60, char_y - 10),
+                               (char_x - 25, char_y + 20, char_x - 10, char_y + 50),
+                               (char_x + 10, char_y + 20, char_x + 25, char_y + 50)):
+            draw.rectangle(box(x0, y0, x1, y1, dy), fill='#4CAF50', outline='#2E7D32', width=2 * s)
+        return image.resize((right - left, bottom - top), Image.LANCZOS)
+
+    frame_count = round(BOB_PERIOD * OVERLAY_FPS)
+    offsets = [-round(BOB_HEIGHT * (1 - math.cos(2 * math.pi * i / frame_count)) / 2) for i in range(frame_count)]
+    distinct = sorted(set(offsets))
+    images = [draw_scene(dy) for dy in distinct]
+    sequence = [distinct.index(dy) for dy in offsets]
+    return left, top, images, sequence
+
+
+class FrameTimer:
+    """Frame intervals and the time spent producing each frame, for the last ``size`` frames"""
+
+    def __init__(self, fps=OVERLAY_FPS, size=600):
+        self.budget = 1.0 / fps
+        self.intervals = deque(maxlen=size)
+        self.work = deque(maxlen=size)
+        self.last = None
+        self.frames = 0
+
+    def record(self, started, finished):
+        if self.last is not None:
+            self.intervals.append(started - self.last)
+        self.last = started
+        self.work.append(finished - started)
+        self.frames += 1
+
+    def summary(self):
+        import statistics
+        if not self.intervals:
+            return f"{self.frames} frames"
+        intervals = sorted(self.intervals)
+        p95 = intervals[min(len(intervals) - 1, int(len(intervals) * 0.95))]
+        late = sum(1 for interval in intervals if interval > self.budget * 1.5)
+        return (f"{self.frames} frames, interval median {statistics.median(intervals) * 1000:.1f} ms, "
+                f"p95 {p95 * 1000:.1f} ms, max {intervals[-1] * 1000:.1f} ms, {late} late; "
+                f"work median {statistics.median(self.work) * 1000:.3f} ms")
+
+
+def benchmark_overlay(seconds=3.0):
+    """Time rendering the overlay frames and, given a display, the animation itself"""
+    for width, height in ((1366, 768), (1920, 1080), (3840, 2160)):
+        start = time.perf_counter()
+        left, top, images, sequence = render_character_frames(width, height)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{width}x{height}: {len(images)} images for {len(sequence)} frames rendered in {elapsed:.1f} ms")
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"No display, skipping the animation benchmark: {e}")
+        return
+    from PIL import ImageTk
+    root.attributes('-fullscreen', True)
+    canvas = tk.Canvas(root, bg='black', highlightthickness=0)
+    canvas.pack(fill=tk.BOTH, expand=True)
+    width, height = canvas.winfo_screenwidth(), canvas.winfo_screenheight()
+    left, top, images, sequence = render_character_frames(width, height)
+    photos = [ImageTk.PhotoImage(image, master=root) for image in images]
+    item = canvas.create_image(left, top, image=photos[0], anchor=tk.NW)
+    timer = FrameTimer()
+    start = time.perf_counter()
+
+    def tick():
+        now = time.perf_counter()
+        canvas.itemconfigure(item, image=photos[sequence[int((now - start) * OVERLAY_FPS) % len(sequence)]])
+        canvas.update_idletasks()
+        timer.record(now, time.perf_counter())
+        if now - start < seconds:
+            root.after(max(1, int((start + timer.frames / OVERLAY_FPS - time.perf_counter()) * 1000)), tick)
+        else:
+            root.quit()
+
+    tick()
+    root.mainloop()
+    root.destroy()
+    print(f"image swap: {timer.summary()}")
+
+
+def startup_report(launches=5, top=10):
+    """Time launches to a visible window and list the slowest imports, like python -X importtime"""
+    import statistics
+    script = os.path.abspath(__file__)
+
+    def launch(*flags):
+        start = time.time()
+        result = subprocess.run([sys.executable, *flags, script, "--startup-probe"],
+                                capture_output=True, text=True)
+        fields = result.stdout.split()
+        if len(fields) < 3 or fields[0] != "ready":
+            raise RuntimeError(f"Startup probe failed: {result.stderr.strip()[-500:]}")
+        return (float(fields[1]) - start) * 1000, " ".join(fields[2:]), result.stderr
+
+    timings = []
+    for _ in range(launches):
+        elapsed, shown, _ = launch()
+        timings.append(elapsed)
+    print(f"Launch to {shown}: median {statistics.median(timings):.0f} ms, best {min(timings):.0f} ms "
+          f"({launches} launches)")
+
+    # The same breakdown as python -X importtime, limited to the modules this script imports directly
+    _, _, stderr = launch("-X", "importtime")
+    modules = []
+    after_site = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue
+        if after_site:
+            modules.append((int(cumulative), name.strip()))
+        # Everything up to site is the interpreter's own startup
+        after_site = after_site or name.strip() == "site"
+    modules.sort(reverse=True)
+    print(f"Imports after startup: {sum(us for us, _ in modules) / 1000:.1f} ms in {len(modules)} top-level modules")
+    for us, name in modules[:top]:
+        print(f"{us / 1000:>8.1f} ms  {name}")
+
+
+class InterventionScheduler:
+    """Decides when to show the overlay, from the detection result of every check.
+
+    A target counts as present after ``confirm_checks`` positive checks in a
+    row and as gone only after ``release_seconds`` without one, so switching
+    tabs for a moment does not start a new episode. Each overlay belongs to
+    an escalation level: it stays up for the level's ``auto_dismiss`` seconds,
+    and once dismissed nothing is shown again for the level's ``cooldown``.
+    Every further overlay goes one level up, until the target has been gone
+    for ``reset_seconds``. Times are passed in, so it can be driven by any clock.
+    """
+
+    IDLE, INTERVENING, COOLDOWN = "idle", "intervening", "cooldown"
+    DEFAULT_LEVELS = [
+        {"cooldown": 120, "auto_dismiss": 60},
+        {"cooldown": 60, "auto_dismiss": 120},
+        {"cooldown": 30, "auto_dismiss": 300},
+    ]
+    # A client that never reports the dismissal (or no client at all) does not block the schedule
+    DISMISS_GRACE = 5.0
+
+    def __init__(self, confirm_checks=1, release_seconds=10.0, reset_seconds=600.0, levels=None):
+        self.confirm_checks = confirm_checks
+        self.release_seconds = release_seconds
+        self.reset_seconds = reset_seconds
+        self.levels = levels or self.DEFAULT_LEVELS
+        self.episodes = 0
+        self.interventions = 0
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from the "intervention" section of the rules file"""
+        levels = [{"cooldown": float(level["cooldown"]), "auto_dismiss": float(level["auto_dismiss"])}
+                  for level in config.get("levels", [])]
+        return cls(int(config.get("confirm_checks", 1)), float(config.get("release_seconds", 10.0)),
+                   float(config.get("reset_seconds", 600.0)), levels)
+
+    def reset(self):
+        self.state = self.IDLE
+        self.until = 0.0
+        self.level = 0
+        self.present = False
+        self.positive = 0
+        self.last_seen = None
+
+    def update(self, detected, now):
+        """Feed one check; returns the overlay to show ({'level', 'auto_dismiss'}) or None"""
+        if detected:
+            if self.last_seen is not None and now - self.last_seen >= self.reset_seconds:
+                self.level = 0
+            self.positive += 1
+            self.last_seen = now
+            if not self.present and self.positive >= self.confirm_checks:
+                self.present = True
+                self.episodes += 1
+        else:
+            self.positive = 0
+            if self.present and now - self.last_seen >= self.release_seconds:
+                self.present = False
+
+        if self.state == self.INTERVENING and now >= self.until + self.DISMISS_GRACE:
+            self.dismissed(now)
+        if self.state == self.COOLDOWN and now >= self.until:
+            self.state = self.IDLE
+        if self.state != self.IDLE or not (detected and self.present):
+            return None
+
+        settings = self.levels[self.level]
+        self.state = self.INTERVENING
+        self.until = now + settings["auto_dismiss"]
+        self.interventions += 1
+        return {"level": self.level, "auto_dismiss": settings["auto_dismiss"]}
+
+    def dismissed(self, now):
+        """The overlay went away: start its level's cooldown and escalate the next one"""
+        if self.state != self.INTERVENING:
+            return
+        self.state = self.COOLDOWN
+        self.until = now + self.levels[self.level]["cooldown"]
+        self.level = min(self.level + 1, len(self.levels) - 1)
+
+
+class TelemetryStore:
+    """Distraction events, buffered in memory and written to SQLite in batches.
+
+    ``record()`` only appends to a buffer, so the detection loop never waits
+    on the disk. A writer thread flushes the buffer every FLUSH_INTERVAL
+    seconds, or as soon as BATCH_SIZE events are waiting, in one transaction
+    that appends the raw events and updates hourly aggregates: counts and
+    totals per kind and target, and a histogram of times to dismissal.
+    Rollups read only the aggregates, however long the log grows.
+    """
+
+    FLUSH_INTERVAL = 30.0
+    BATCH_SIZE = 512
+    # Dismissal times are counted in buckets growing by sqrt(2) from a quarter second
+    BUCKET_BASE = 0.25
+    BUCKETS = 32
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (ts REAL NOT NULL, kind TEXT NOT NULL, target TEXT, value REAL);
+        CREATE TABLE IF NOT EXISTS rollup (
+            hour INTEGER NOT NULL, kind TEXT NOT NULL, target TEXT NOT NULL,
+            count INTEGER NOT NULL, total REAL NOT NULL,
+            PRIMARY KEY (hour, kind, target)) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS dismiss_histogram (
+            hour INTEGER NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL,
+            PRIMARY KEY (hour, bucket)) WITHOUT ROWID;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.buffer = deque()
+        self.wake = threading.Event()
+        self.closing = False
+        self.thread = None
+        self.flushed = 0
+
+    def start(self):
+        """Start the writer thread; events recorded before are kept until then"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def record(self, kind, target=None, value=None, ts=None):
+        self.buffer.append((ts or time.time(), kind, target, value))
+        if len(self.buffer) >= self.BATCH_SIZE:
+            self.wake.set()
+
+    def run(self):
+        import sqlite3
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(self.SCHEMA)
+            while True:
+                self.wake.wait(self.FLUSH_INTERVAL)
+                self.wake.clear()
+                # Read before flushing: events recorded during this flush need one more
+                closing = self.closing
+                self.flush(db)
+                if closing:
+                    return
+        finally:
+            db.close()
+
+    @staticmethod
+    def local_hour(ts):
+        """Hours since the epoch in local time, so days roll over at local midnight"""
+        return int((ts + time.localtime(ts).tm_gmtoff) // 3600)
+
+    @classmethod
+    def bucket(cls, seconds):
+        if seconds < cls.BUCKET_BASE:
+            return 0
+        return min(cls.BUCKETS - 1, int(2 * math.log2(seconds / cls.BUCKET_BASE)) + 1)
+
+    def flush(self, db):
+        """Append the buffered events and fold them into the aggregates, in one transaction"""
+        import sqlite3
+        events = []
+        while self.buffer:
+            events.append(self.buffer.popleft())
+        if not events:
+            return
+        counts = {}
+        histogram = {}
+        for ts, kind, target, value in events:
+            hour = self.local_hour(ts)
+            key = (hour, kind, target or "")
+            count, total = counts.get(key, (0, 0.0))
+            counts[key] = (count + 1, total + (value or 0.0))
+            if kind == "dismiss" and value is not None:
+                key = (hour, self.bucket(value))
+                histogram[key] = histogram.get(key, 0) + 1
+        try:
+            with db:
+                db.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", events)
+                db.executemany("INSERT INTO rollup VALUES (?, ?, ?, ?, ?) ON CONFLICT (hour, kind, target) "
+                               "DO UPDATE SET count = count + excluded.count, total = total + excluded.total",
+                               [key + value for key, value in counts.items()])
+                db.executemany("INSERT INTO dismiss_histogram VALUES (?, ?, ?) ON CONFLICT (hour, bucket) "
+                               "DO UPDATE SET count = count + excluded.count",
+                               [key + (count,) for key, count in histogram.items()])
+            self.flushed += len(events)
+        except sqlite3.Error as e:
+            # Keep the events for the next flush rather than losing them
+            print(f"Could not write telemetry: {e}")
+            self.buffer.extendleft(reversed(events))
+
+    def close(self):
+        """Write what is still buffered and stop the writer thread"""
+        self.closing = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+
+    def rollup(self, period="day", limit=14):
+        """Per hour or per day: event counts, and dismissal times from the histogram, newest first"""
+        import sqlite3
+        hours = {"hour": 1, "day": 24}[period]
+        if not os.path.exists(self.path):
+            return []
+        db = sqlite3.connect(self.path)
+        try:
+            newest = db.execute("SELECT MAX(hour) FROM rollup").fetchone()[0]
+            if newest is None:
+                return []
+            first = (newest // hours - limit + 1) * hours
+            slots = {}
+            for slot, kind, count, total in db.execute(
+                    "SELECT hour / ? AS slot, kind, SUM(count), SUM(total) FROM rollup "
+                    "WHERE hour >= ? GROUP BY slot, kind", (hours, first)):
+                row = slots.setdefault(slot, {})
+                row[kind] = count
+                if kind == "dismiss" and count:
+                    row["dismiss_mean"] = round(total / count, 2)
+            buckets = {}
+            for slot, bucket, count in db.execute(
+                    "SELECT hour / ? AS slot, bucket, SUM(count) FROM dismiss_histogram "
+                    "WHERE hour >= ? GROUP BY slot, bucket ORDER BY slot, bucket", (hours, first)):
+                buckets.setdefault(slot, []).append((bucket, count))
+        except sqlite3.OperationalError:
+            # Nothing has been flushed yet
+            return []
+        finally:
+            db.close()
+
+        rows = []
+        for slot in sorted(slots, reverse=True):
+            start = datetime.datetime(1970, 1, 1) + datetime.timedelta(hours=slot * hours)
+            row = {"start": start.isoformat(timespec='minutes'), **slots[slot]}
+            for name, fraction in (("dismiss_p50", 0.5), ("dismiss_p90", 0.9)):
+                value = self.percentile(buckets.get(slot, []), fraction)
+                if value is not None:
+                    row[name] = value
+            rows.append(row)
+        return rows
+
+    @classmethod
+    def percentile(cls, buckets, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of dismissals"""
+        total = sum(count for _, count in buckets)
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen >= fraction * total:
+                return round(cls.BUCKET_BASE * 2 ** (bucket / 2), 2)
+        return None
+
+
+def benchmark_telemetry(events=100000, days=30):
+    """Time recording, batched writes and rollups from aggregates against scanning the raw log"""
+    import random
+    import sqlite3
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "telemetry.sqlite3")
+    store = TelemetryStore(path)
+    store.start()
+    rng = random.Random(1)
+    now = time.time()
+    start = time.perf_counter()
+    for _ in range(events):
+        ts = now - rng.uniform(0, days * 86400)
+        kind = rng.choice(("detection", "shown", "dismiss", "dismiss", "force_dismiss"))
+        value = rng.expovariate(1 / 8) if kind == "dismiss" else (60.0 if kind == "force_dismiss" else None)
+        store.record(kind, rng.choice(("Instagram", "YouTube", "Reddit")), value, ts=ts)
+    record_us = (time.perf_counter() - start) / events * 1e6
+    start = time.perf_counter()
+    store.close()
+    drain_ms = (time.perf_counter() - start) * 1000
+    print(f"record: {record_us:.2f} us per event; {store.flushed} events written, "
+          f"{drain_ms:.0f} ms to drain the buffer on close")
+
+    for period in ("hour", "day"):
+        start = time.perf_counter()
+        rows = store.rollup(period, limit=days)
+        print(f"rollup per {period}: {(time.perf_counter() - start) * 1000:.2f} ms for {len(rows)} rows")
+    db = sqlite3.connect(path)
+    start = time.perf_counter()
+    db.execute("SELECT CAST(ts / 86400 AS INTEGER) AS day, kind, COUNT(*) FROM events GROUP BY day, kind").fetchall()
+    print(f"same counts from the raw events: {(time.perf_counter() - start) * 1000:.2f} ms")
+    db.close()
+    if rows:
+        print(f"latest day: {rows[0]}")
+
+
+def control_socket_path():
+    """Where the headless monitor listens for control commands"""
+    import tempfile
+    if os.environ.get("FOCUS_CONTROL_SOCKET"):
+        return os.environ["FOCUS_CONTROL_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "instafocusmode.sock")
+    return os.path.join(tempfile.gettempdir(), f"instafocusmode-{os.getuid()}.sock")
+
+
+class FocusMonitor:
+    """Detection state and loop, without any GUI.
+
+    The loop runs on asyncio. Everything that blocks (waiting for a window
+    change, helper queries, process scans) runs on one worker thread, so
+    those objects are never used from two threads at once. Monitoring is
+    switched on and off, and queried, only through ``handle()`` on the
+    event loop, and changes are pushed to ``listeners`` as event dicts.
+    """
+
+    def __init__(self, rules_file=RULES_FILE, telemetry_file=TELEMETRY_FILE):
+        # Persistent process answering window queries (Windows, macOS or FOCUS_WINDOW_HELPER)
+        self.window_helper = None
+        
+        # What to block, and the running processes, re-examined only when new PIDs appear
+        try:
+            self.rules = RuleSet.load(rules_file)
+        except (OSError, ValueError) as e:
+            print(f"Could not load rules, blocking Instagram only: {e}")
+            self.rules = RuleSet.default()
+        self.process_tracker = ProcessTracker(self.rules.match_process)
+        self.detected_target = None
+        
+        # Called on the event loop with every event; must not block
+        self.listeners = []
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.active = False
+        self.changed = None
+        self.watcher_name = None
+        self.started = time.monotonic()
+        self.active_since = None
+        self.active_seconds = 0.0
+        self.checks = 0
+        self.detections = 0
+        self.last_detection = None
+        self.overlay_animation = None
+        self.telemetry = TelemetryStore(telemetry_file)
+        
+        # When to show the overlay; a detection is recorded once per episode, not on every check
+        try:
+            self.scheduler = InterventionScheduler.from_config(self.rules.intervention)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Invalid intervention settings, using the defaults: {e}")
+            self.scheduler = InterventionScheduler()
+        
+        # Which detectors to use, and an optional callable given the timings of every tick
+        self.system = platform.system()
+        self.tick_hook = None
+
+    def emit(self, event):
+        for listener in list(self.listeners):
+            listener(event)
+
+    def set_active(self, active):
+        if active == self.active:
+            return
+        self.active = active
+        if active:
+            self.active_since = time.monotonic()
+        else:
+            self.active_seconds += time.monotonic() - self.active_since
+            self.detected_target = None
+        if self.changed is not None:
+            self.changed.set()
+        self.emit({"event": "state", "active": active})
+
+    async def handle(self, command):
+        """Answer one control command: on, off, status, stats, profile on|off, report [hour|day], record {json} or animation {summary}"""
+        import asyncio
+        command, _, argument = command.partition(" ")
+        if command == "on":
+            self.set_active(True)
+        elif command == "off":
+            self.set_active(False)
+        elif command == "stats":
+            return self.stats()
+        elif command == "profile":
+            # Per-tick timings of the live monitor, summarised in stats
+            if argument.strip() not in ("on", "off"):
+                return {"error": "Use: profile on|off"}
+            self.tick_hook = TickRecorder() if argument.strip() == "on" else None
+            return {"profiling": self.tick_hook is not None}
+        elif command == "report":
+            period = argument.strip() or "day"
+            if period not in ("hour", "day"):
+                return {"error": f"Unknown period: {period}"}
+            rows = await asyncio.get_running_loop().run_in_executor(None, self.telemetry.rollup, period)
+            return {"period": period, "rows": rows, "pending": len(self.telemetry.buffer)}
+        elif command == "record":
+            # Sent by the window app for what happens to the overlay
+            try:
+                event = json.loads(argument)
+                if event["kind"] not in ("shown", "dismiss", "force_dismiss"):
+                    raise ValueError(f"unknown kind {event['kind']!r}")
+                self.telemetry.record(event["kind"], event.get("target"), event.get("value"))
+                if event["kind"] != "shown":
+                    self.scheduler.dismissed(time.monotonic())
+            except (ValueError, KeyError, TypeError) as e:
+                return {"error": f"Bad record: {e}"}
+            return {"recorded": event["kind"]}
+        elif command == "animation":
+            # Frame timings of the last overlay, sent by the window app and shown in stats
+            self.overlay_animation = argument.strip()
+            return {"recorded": "animation"}
+        elif command != "status":
+            return {"error": f"Unknown command: {command}"}
+        return self.status()
+
+    def status(self):
+        return {"active": self.active, "watcher": self.watcher_name,
+                "detected": self.detected_target, "rules": len(self.rules.rules),
+                "intervention": self.scheduler.state, "level": self.scheduler.level}
+
+    def stats(self):
+        active_seconds = self.active_seconds
+        if self.active:
+            active_seconds += time.monotonic() - self.active_since
+        return {"uptime": round(time.monotonic() - self.started, 1), "active_seconds": round(active_seconds, 1),
+                "checks": self.checks, "detections": self.detections, "last_detection": self.last_detection,
+                "processes": self.process_tracker.stats(),
+                "telemetry": {"pending": len(self.telemetry.buffer), "written": self.telemetry.flushed},
+                "ticks": self.tick_hook.summary() if isinstance(self.tick_hook, TickRecorder) else None,
+                "overlay_animation": self.overlay_animation}
+
+    async def run(self):
+        """Monitor whenever monitoring is on, until cancelled"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+        self.telemetry.start()
+        try:
+            while True:
+                if not self.active:
+                    self.changed.clear()
+                    await self.changed.wait()
+                    continue
+                watcher = await loop.run_in_executor(self.executor, create_window_watcher,
+                                                     self.get_active_window_title)
+                self.watcher_name = watcher.name
+                print(f"Detecting the active window with: {watcher.name}")
+                try:
+                    await self.watch(watcher)
+                finally:
+                    await loop.run_in_executor(self.executor, watcher.close)
+        finally:
+            if self.window_helper:
+                await loop.run_in_executor(self.executor, self.window_helper.close)
+            self.executor.shutdown(wait=False)
+            self.telemetry.close()
+
+    async def watch(self, watcher):
+        """Check the active window each time it changes, until monitoring is switched off"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        last_title = None
+        last_scan = 0
+        self.scheduler.reset()
+        while self.active:
+            try:
+                # Returns early when the active window changes (event backends)
+                waited = time.perf_counter()
+                title = await loop.run_in_executor(self.executor, watcher.wait, RECHECK_INTERVAL)
+                waited = time.perf_counter() - waited
+                if not self.active:
+                    break
+                now = time.monotonic()
+                scan_processes = title != last_title or now - last_scan >= PROCESS_SCAN_INTERVAL
+                if scan_processes:
+                    last_title, last_scan = title, now
+                self.checks += 1
+                detected, check_ms, cpu_ms = await loop.run_in_executor(
+                    self.executor, self.timed_check, title, scan_processes)
+                if self.tick_hook is not None:
+                    self.tick_hook({"wait_ms": waited * 1000, "check_ms": check_ms, "cpu_ms": cpu_ms,
+                                    "scanned": scan_processes, "detected": detected})
+                if detected:
+                    self.detections += 1
+                    self.last_detection = datetime.datetime.now().isoformat(timespec='seconds')
+                episodes = self.scheduler.episodes
+                intervention = self.scheduler.update(detected, time.monotonic())
+                if self.scheduler.episodes != episodes:
+                    self.telemetry.record("detection", self.detected_target)
+                if intervention:
+                    self.emit({"event": "intervene", "target": self.detected_target, **intervention})
+            except Exception as e:
+                print(f"Monitoring error: {e}")
+                if self.tick_hook is not None:
+                    self.tick_hook({"error": str(e), "backoff": MONITOR_ERROR_BACKOFF})
+                await asyncio.sleep(MONITOR_ERROR_BACKOFF)
+
+    def timed_check(self, title, scan_processes):
+        """is_instagram_active, with its wall and CPU time in ms; runs on the worker thread"""
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        detected = self.is_instagram_active(title, scan_processes)
+        return detected, (time.perf_counter() - start) * 1000, (time.thread_time() - cpu_start) * 1000
+
+    async def serve(self, path):
+        """Accept control connections on a Unix-domain socket at path"""
+        import asyncio
+        server = await asyncio.start_unix_server(self.handle_client, path=path)
+        os.chmod(path, 0o600)
+        return server
+
+    async def handle_client(self, reader, writer):
+        """One JSON reply per command line; 'subscribe' turns the connection into an event stream"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode('utf-8', 'replace').strip()
+                if command == "subscribe":
+                    await self.stream_events(reader, writer)
+                    break
+                reply = await self.handle(command)
+                writer.write((json.dumps(reply) + "\n").encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stream_events(self, reader, writer):
+        import asyncio
+        events = asyncio.Queue()
+        self.listeners.append(events.put_nowait)
+        # The subscriber sends nothing more, so reading only returns once it has gone
+        gone = asyncio.ensure_future(reader.read())
+        try:
+            event = {"event": "state", **self.status()}
+            while True:
+                writer.write((json.dumps(event) + "\n").encode('utf-8'))
+                await writer.drain()
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if gone.done():
+                    next_event.cancel()
+                    return
+                event = next_event.result()
+        finally:
+            gone.cancel()
+            self.listeners.remove(events.put_nowait)
+
+    def is_instagram_active(self, title=None, scan_processes=True):
+        """Check if a blocked target is in the active window or, optionally, running at all"""
+        try:
+            if title is None:
+                title = self.get_active_window_title()
+            matches = self.rules.active(self.rules.match_title(title))
+            if not matches and scan_processes:
+                if self.system == "Darwin":  # macOS
+                    matches = self.check_macos_instagram()
+                else:  # Windows and Linux
+                    matches = self.check_active_window()
+            self.detected_target = matches[0] if matches else None
+            return bool(matches)
+        except Exception as e:
+            print(f"Error checking Instagram: {e}")
+            return False
+            
+    def get_active_window_title(self):
+        """Title of the foreground window, or an empty string if it cannot be read"""
+        helper = self.get_window_helper()
+        if helper is not None:
+            return helper.query("title")
+        return self.get_linux_window_title()
+        
+    def get_window_helper(self):
+        """The helper process for window queries, if this platform uses one"""
+        if self.window_helper is None:
+            # FOCUS_WINDOW_HELPER=fake runs the protocol against a local fake on any platform
+            kind = os.environ.get("FOCUS_WINDOW_HELPER") or {"Windows": "windows", "Darwin": "macos"}.get(self.system)
+            if kind:
+                self.window_helper = WindowHelper(helper_command(kind))
+        return self.window_helper
+            
+    def check_active_window(self):
+        """Names of the active rules matched by running processes on Windows and Linux"""
+        try:
+            # Check running processes
+            return self.rules.active(self.process_tracker.scan())
+                    
+        except Exception as e:
+            print(f"Process check error: {e}")
+            
+        return []
+        
+    def check_macos_instagram(self):
+        """Names of the active rules matched by running applications on macOS"""
+        try:
+            # Check running applications
+            matched = set()
+            for name in self.get_window_helper().query("processes").split("\t"):
+                matched |= self.rules.match_process(name)
+            return self.rules.active(matched)
+                
+        except Exception as e:
+            print(f"macOS check error: {e}")
+            
+        return []
+        
+    def get_linux_window_title(self):
+        """Read the active window title on Linux using xdotool"""
+        try:
+            result = subprocess.run(['xdotool', 'getactivewindow', 'getwindowname'],
+                                  capture_output=True, text=True)
+            return result.stdout.strip()
+        except:
+            return ""
+
+
+class MonitorThread:
+    """Runs a FocusMonitor on its own event loop thread, for a GUI without a separate daemon"""
+
+    def __init__(self, monitor):
+        import asyncio
+        self.monitor = monitor
+        self.events = queue.Queue()
+        monitor.listeners.append(self.events.put)
+        self.loop = asyncio.new_event_loop()
+        self.task = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        import asyncio
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.monitor.run())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+
+    def command(self, name):
+        """Send a control command from another thread and wait for the reply"""
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(self.monitor.handle(name), self.loop).result(timeout=5)
+
+    def close(self):
+        """Stop monitoring and the helper process; the loop ends once they are closed"""
+        self.loop.call_soon_threadsafe(lambda: self.task.cancel())
+        self.thread.join(timeout=5)
+
+
+class ControlClient:
+    """Talks to a headless monitor over its control socket; events arrive on ``events``"""
+
+    def __init__(self, path=None, timeout=5.0):
+        self.path = path or control_socket_path()
+        self.timeout = timeout
+        self.events = queue.Queue()
+        self.stream = None
+
+    def command(self, name):
+        """Send one command and return the monitor's reply"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall((name + "\n").encode('utf-8'))
+            with sock.makefile('r', encoding='utf-8') as f:
+                reply = f.readline()
+        if not reply:
+            raise ConnectionError("The monitor closed the connection")
+        return json.loads(reply)
+
+    def subscribe(self):
+        """Start receiving events in the background; the first one is the current state"""
+        self.stream = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.stream.connect(self.path)
+        self.stream.sendall(b"subscribe\n")
+        threading.Thread(target=self.read_events, args=(self.stream,), daemon=True).start()
+
+    def read_events(self, stream):
+        try:
+            with stream.makefile('r', encoding='utf-8') as f:
+                for line in f:
+                    self.events.put(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        self.events.put({"event": "disconnected"})
+
+    def close(self):
+        if self.stream is not None:
+            try:
+                self.stream.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.stream.close()
+            self.stream = None
+
+
+def connect_monitor():
+    """A client of the running headless monitor if there is one, else a monitor of our own"""
+    if hasattr(socket, "AF_UNIX") and os.path.exists(control_socket_path()):
+        client = ControlClient()
+        try:
+            client.subscribe()
+            print(f"Attached to the monitor at {client.path}")
+            return client
+        except OSError:
+            client.close()
+    return MonitorThread(FocusMonitor())
+
+
+def run_daemon(start_active=False):
+    """Run the monitor without a GUI, controlled through its Unix-domain socket"""
+    import asyncio
+    import signal
+    if not hasattr(socket, "AF_UNIX") or platform.system() == "Windows":
+        print("The headless monitor needs Unix-domain sockets, which this platform does not offer")
+        return 1
+    path = control_socket_path()
+    if os.path.exists(path):
+        try:
+            ControlClient(path, timeout=1).command("status")
+            print(f"A monitor is already listening on {path}")
+            return 1
+        except (OSError, ValueError):
+            # Left behind by a monitor that did not shut down cleanly
+            os.unlink(path)
+
+    async def main():
+        monitor = FocusMonitor()
+        monitor.listeners.append(lambda event: print(json.dumps(event), flush=True))
+        server = await monitor.serve(path)
+        task = asyncio.ensure_future(monitor.run())
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        if start_active:
+            monitor.set_active(True)
+        print(f"Monitor listening on {path}")
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            os.unlink(path)
+
+    asyncio.run(main())
+    return 0
+
+
+def percentile(values, fraction):
+    """The value below which the given fraction of values fall (nearest rank)"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class TickRecorder:
+    """Per-tick timings from a running FocusMonitor, installed as its tick_hook.
+
+    Each tick records how long the monitor waited for a window change, how
+    long the check took (wall and CPU on the worker thread) and whether it
+    listed processes; monitoring errors are recorded with the back-off they
+    caused. Only the last ``size`` ticks are kept.
+    """
+
+    def __init__(self, size=1000):
+        self.ticks = deque(maxlen=size)
+
+    def __call__(self, tick):
+        self.ticks.append(tick)
+
+    def summary(self):
+        checks = [tick for tick in self.ticks if "check_ms" in tick]
+        errors = [tick for tick in self.ticks if "error" in tick]
+        summary = {"ticks": len(self.ticks), "errors": len(errors),
+                   "backoff_seconds": sum(tick["backoff"] for tick in errors)}
+        if checks:
+            check_ms = [tick["check_ms"] for tick in checks]
+            summary.update({
+                "check_ms_p50": round(percentile(check_ms, 0.5), 3),
+                "check_ms_p99": round(percentile(check_ms, 0.99), 3),
+                "cpu_ms_mean": round(sum(tick["cpu_ms"] for tick in checks) / len(checks), 3),
+                "wait_ms_mean": round(sum(tick["wait_ms"] for tick in checks) / len(checks), 1),
+                "process_scans": sum(1 for tick in checks if tick["scanned"]),
+            })
+        if errors:
+            summary["last_error"] = errors[-1]["error"]
+        return summary
+
+
+class SyntheticProcess:
+    """The part of psutil.Process that ProcessTracker uses"""
+
+    def __init__(self, desktop, pid):
+        self.desktop = desktop
+        self.pid = pid
+
+    def oneshot(self):
+        import contextlib
+        return contextlib.nullcontext()
+
+    def name(self):
+        try:
+            return self.desktop.names[self.pid]
+        except KeyError:
+            raise psutil.NoSuchProcess(self.pid)
+
+    def create_time(self):
+        return float(self.pid)
+
+
+class SyntheticDesktop:
+    """A made-up desktop for benchmarks: a churning process table and a window title provider.
+
+    It stands in for psutil (``pids()``, ``process_iter()``, ``Process(pid)``) and for the window
+    helper (``query()``), so the detectors run unchanged without looking at
+    the real system. ``tick()`` starts and ends ``churn`` processes and moves
+    to the next title every ``switch_every`` ticks; with ``error_rate`` a
+    query fails now and then, like a helper that died.
+    """
+
+    TITLES = ["main.py - Visual Studio Code", "Inbox (3) - Mail", "Terminal",
+              "Lecture notes.pdf - Reader", "Instagram - Google Chrome"]
+    NAMES = ["python3", "code", "chrome", "firefox", "bash", "systemd", "Xorg", "pipewire",
+             "sshd", "dockerd", "node", "java", "kworker/0:1", "gnome-shell", "slack"]
+
+    def __init__(self, processes=2000, churn=0, switch_every=5, error_rate=0.0, seed=1):
+        import random
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.switch_every = switch_every
+        self.error_rate = error_rate
+        self.names = {}
+        self.processes = {}
+        self.next_pid = 100
+        for _ in range(processes):
+            self.spawn()
+        self.ticks = 0
+        self.title = self.TITLES[0]
+
+    def spawn(self):
+        self.names[self.next_pid] = f"{self.rng.choice(self.NAMES)}-{self.next_pid}"
+        self.next_pid += 1
+
+    def tick(self):
+        self.ticks += 1
+        for pid in self.rng.sample(list(self.names), min(self.churn, len(self.names))):
+            del self.names[pid]
+            self.processes.pop(pid, None)
+        for _ in range(self.churn):
+            self.spawn()
+        if self.switch_every and self.ticks % self.switch_every == 0:
+            self.title = self.TITLES[(self.ticks // self.switch_every) % len(self.TITLES)]
+
+    def pids(self):
+        return list(self.names)
+
+    def Process(self, pid):
+        return SyntheticProcess(self, pid)
+
+    def process_iter(self, attrs=None):
+        """Like psutil.process_iter: one object per process, kept between calls"""
+        for pid in list(self.names):
+            proc = self.processes.get(pid)
+            if proc is None:
+                proc = self.processes[pid] = SyntheticProcess(self, pid)
+                proc.info = {'create_time': proc.create_time()}
+            yield proc
+
+    def query(self, request):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise OSError("synthetic helper failure")
+        if request == "title":
+            return self.title
+        if request == "processes":
+            return "\t".join(self.names.values())
+        return ""
+
+
+def benchmark_detectors(ticks=1000, processes=2000):
+    """Latency, CPU and allocations of is_instagram_active per platform backend on synthetic desktops"""
+    import contextlib
+    import io
+    import tracemalloc
+    scenarios = [
+        ("steady", dict(switch_every=0)),
+        ("switching", dict(switch_every=1)),
+        ("churn", dict(switch_every=0, churn=20)),
+        ("errors", dict(switch_every=1, error_rate=0.1)),
+    ]
+    print(f"{processes} processes, {ticks} ticks; a steady title lists processes every "
+          f"{PROCESS_SCAN_INTERVAL / RECHECK_INTERVAL:.0f} ticks")
+    print(f"{'backend':>8} {'scenario':>10} {'p50 us':>9} {'p99 us':>9} {'cpu us/tick':>12} "
+          f"{'peak KiB':>9} {'kept KiB':>9} {'detected':>9}")
+    for system in ("Linux", "Windows", "Darwin"):
+        for label, options in scenarios:
+            def setup():
+                desktop = SyntheticDesktop(processes=processes, **options)
+                monitor = FocusMonitor(rules_file=None)
+                monitor.system = system
+                monitor.window_helper = desktop
+                monitor.process_tracker = ProcessTracker(monitor.rules.match_process, source=desktop)
+                # Start from a warm cache, as a monitor that has been running for a while would
+                monitor.process_tracker.scan()
+                return desktop, monitor
+
+            def run(desktop, monitor, measure):
+                last_title = None
+                detected = 0
+                timings = []
+                for i in range(ticks):
+                    desktop.tick()
+                    title = monitor.get_active_window_title() if not desktop.error_rate else desktop.title
+                    # As in FocusMonitor.watch: list processes on a title change or every few ticks
+                    scan_processes = title != last_title or i % round(PROCESS_SCAN_INTERVAL / RECHECK_INTERVAL) == 0
+                    last_title = title
+                    start = time.perf_counter()
+                    detected += monitor.is_instagram_active(None if desktop.error_rate else title, scan_processes)
+                    if measure:
+                        timings.append((time.perf_counter() - start) * 1e6)
+                return timings, detected
+
+            # Detector error messages would drown the table
+            with contextlib.redirect_stdout(io.StringIO()):
+                desktop, monitor = setup()
+                cpu_start = time.process_time()
+                timings, detected = run(desktop, monitor, measure=True)
+                cpu_us = (time.process_time() - cpu_start) / ticks * 1e6
+
+                # Separate pass, as tracemalloc slows everything down; setup is not counted
+                desktop, monitor = setup()
+                tracemalloc.start()
+                baseline = tracemalloc.get_traced_memory()[0]
+                run(desktop, monitor, measure=False)
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            print(f"{system:>8} {label:>10} {percentile(timings, 0.5):>9.1f} {percentile(timings, 0.99):>9.1f} "
+                  f"{cpu_us:>12.1f} {(peak - baseline) / 1024:>9.0f} {(current - baseline) / 1024:>9.0f} "
+                  f"{detected:>9}")
+
 
 class FocusModeApp:
-    def __init__(self):
+    def __init__(self, monitor=None):
         self.root = tk.Tk()
         self.root.title("Focus Mode Controller")
         self.root.geometry("300x200")
         self.root.resizable(False, False)
         
-        # Focus mode state
+        # Focus mode state, as last reported by the monitor (a MonitorThread or ControlClient)
+        self.monitor = monitor or connect_monitor()
         self.focus_mode_active = False
-        self.monitoring_thread = None
-        self.stop_monitoring = False
+        self.detected_target = None
         
-        # Game overlay window
+        # Game overlay window, created on the first intervention and then hidden between them
         self.overlay_window = None
+        self.overlay_visible = False
+        self.overlay_size = None
         self.character_canvas = None
+        self.message_item = None
+        self.instructions_item = None
         self.dismiss_timer = None
+        self.overlay_opened = None
+        
+        # Pre-rendered character frames per screen size, and the animation driving them
+        self.overlay_frames = {}
+        self.character_item = None
+        self.character_frames = None
+        self.animation_job = None
+        self.frame_timer = None
         
         self.setup_ui()
+        self.poll_monitor()
         
     def setup_ui(self):
         # Main frame
@@ -116,150 +2067,80 @@ class FocusModeApp:
             self.start_focus_mode()
             
     def start_focus_mode(self):
-        self.focus_mode_active = True
-        self.stop_monitoring = False
-        self.status_label.config(text="Status: ON - Monitoring...")
-        self.toggle_btn.config(text="Turn OFF Focus Mode")
-        
-        # Start monitoring thread
-        self.monitoring_thread = threading.Thread(target=self.monitor_instagram, daemon=True)
-        self.monitoring_thread.start()
+        self.send_command("on")
         
     def stop_focus_mode(self):
-        self.focus_mode_active = False
-        self.stop_monitoring = True
-        self.status_label.config(text="Status: OFF")
-        self.toggle_btn.config(text="Turn ON Focus Mode")
+        self.send_command("off")
         
-        # Close overlay if open
-        if self.overlay_window:
-            self.close_overlay()
-            
-    def monitor_instagram(self):
-        """Monitor for Instagram windows and trigger intervention"""
-        while not self.stop_monitoring:
-            try:
-                if self.is_instagram_active():
-                    self.trigger_focus_intervention()
-                time.sleep(2)  # Check every 2 seconds
-            except Exception as e:
-                print(f"Monitoring error: {e}")
-                time.sleep(5)
-                
-    def is_instagram_active(self):
-        """Check if Instagram is running in any active window"""
+    def send_command(self, command):
+        """Ask the monitor to switch on or off and show the state it reports back"""
         try:
-            if platform.system() == "Windows":
-                return self.check_windows_instagram()
-            elif platform.system() == "Darwin":  # macOS
-                return self.check_macos_instagram()
-            else:  # Linux
-                return self.check_linux_instagram()
-        except Exception as e:
-            print(f"Error checking Instagram: {e}")
-            return False
+            self.show_state(self.monitor.command(command)["active"])
+        except (OSError, ValueError, KeyError, concurrent.futures.TimeoutError) as e:
+            print(f"Monitor unavailable: {e}")
+            self.status_label.config(text="Status: monitor unavailable")
             
-    def check_windows_instagram(self):
-        """Check for Instagram on Windows"""
-        try:
-            # Check running processes
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                try:
-                    name = proc.info['name'].lower()
-                    if 'instagram' in name:
-                        return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-                    
-            # Check active window titles using PowerShell
-            try:
-                cmd = '''
-                Add-Type -AssemblyName System.Windows.Forms
-                $window = [System.Windows.Forms.Application]::OpenForms | Select-Object -First 1
-                if ($window) { $window.Text } else {
-                    Add-Type @"
-                        using System;
-                        using System.Runtime.InteropServices;
-                        using System.Text;
-                        public class Win32 {
-                            [DllImport("user32.dll")]
-                            public static extern IntPtr GetForegroundWindow();
-                            [DllImport("user32.dll")]
-                            public static extern int GetWindowText(IntPtr hWnd, StringBuilder text, int count);
-                        }
-"@
-                    $hwnd = [Win32]::GetForegroundWindow()
-                    $text = New-Object System.Text.StringBuilder(256)
-                    [Win32]::GetWindowText($hwnd, $text, $text.Capacity)
-                    $text.ToString()
-                }
-                '''
-                result = subprocess.run(['powershell', '-Command', cmd], 
-                                      capture_output=True, text=True)
-                if result.stdout and 'instagram' in result.stdout.lower():
-                    return True
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"Windows check error: {e}")
+    def show_state(self, active):
+        self.focus_mode_active = active
+        if active:
+            self.status_label.config(text="Status: ON - Monitoring...")
+            self.toggle_btn.config(text="Turn OFF Focus Mode")
+        else:
+            self.status_label.config(text="Status: OFF")
+            self.toggle_btn.config(text="Turn ON Focus Mode")
             
-        return False
-        
-    def check_macos_instagram(self):
-        """Check for Instagram on macOS"""
-        try:
-            # Check running applications
-            result = subprocess.run(['osascript', '-e', 
-                                   'tell application "System Events" to get name of every process'],
-                                  capture_output=True, text=True)
-            if result.stdout and 'instagram' in result.stdout.lower():
-                return True
+            # Close overlay if open
+            if self.overlay_visible:
+                self.close_overlay()
                 
-            # Check active window title
-            result = subprocess.run(['osascript', '-e',
-                                   'tell application "System Events" to get title of front window of (first application process whose frontmost is true)'],
-                                  capture_output=True, text=True)
-            if result.stdout and 'instagram' in result.stdout.lower():
-                return True
-                
-        except Exception as e:
-            print(f"macOS check error: {e}")
-            
-        return False
-        
-    def check_linux_instagram(self):
-        """Check for Instagram on Linux"""
-        try:
-            # Check running processes
-            for proc in psutil.process_iter(['pid', 'name']):
-                if 'instagram' in proc.info['name'].lower():
-                    return True
-                    
-            # Try to get active window title using xdotool
+    def poll_monitor(self):
+        """Apply the monitor's events on the Tk thread"""
+        while True:
             try:
-                result = subprocess.run(['xdotool', 'getactivewindow', 'getwindowname'],
-                                      capture_output=True, text=True)
-                if result.stdout and 'instagram' in result.stdout.lower():
-                    return True
-            except:
-                pass
-                
-        except Exception as e:
-            print(f"Linux check error: {e}")
-            
-        return False
+                event = self.monitor.events.get_nowait()
+            except queue.Empty:
+                break
+            if event["event"] == "state":
+                self.show_state(event["active"])
+            elif event["event"] == "intervene":
+                self.detected_target = event["target"]
+                if self.focus_mode_active:
+                    self.trigger_focus_intervention(event["level"], event["auto_dismiss"])
+            elif event["event"] == "disconnected":
+                self.show_state(False)
+                self.status_label.config(text="Status: monitor stopped")
+        self.root.after(100, self.poll_monitor)
         
-    def trigger_focus_intervention(self):
+    def trigger_focus_intervention(self, level=0, auto_dismiss=60):
         """Show the game-like intervention overlay"""
-        if self.overlay_window:  # Already showing
+        if self.overlay_visible:  # Already showing
             return
             
-        self.create_overlay_window()
+        # The overlay window is built once and then only shown and hidden,
+        # unless the screen size changed since it was built
+        screen_size = (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+        if self.overlay_window and self.overlay_size != screen_size:
+            self.overlay_window.destroy()
+            self.overlay_window = None
+        if not self.overlay_window:
+            self.create_overlay_window()
+            self.overlay_size = screen_size
+        self.show_overlay(level, auto_dismiss)
+        self.overlay_opened = time.monotonic()
+        self.report_event("shown")
+        
+    def report_event(self, kind, value=None):
+        """Pass what happened to the overlay on to the monitor's telemetry"""
+        event = {"kind": kind, "target": self.detected_target, "value": value}
+        try:
+            self.monitor.command("record " + json.dumps(event))
+        except (OSError, ValueError, concurrent.futures.TimeoutError) as e:
+            print(f"Could not record {kind}: {e}")
         
     def create_overlay_window(self):
-        """Create the game-like overlay window"""
+        """Create the game-like overlay window, hidden until show_overlay"""
         self.overlay_window = tk.Toplevel()
+        self.overlay_window.withdraw()
         self.overlay_window.title("Focus Guardian")
         
         # Make it fullscreen and topmost
@@ -281,9 +2162,36 @@ class FocusModeApp:
         # Draw character and message
         self.draw_focus_character()
         
-        # Set auto-dismiss timer (1 minute)
-        self.dismiss_timer = self.overlay_window.after(60000, self.force_dismiss)
+    def show_overlay(self, level, auto_dismiss):
+        """Bring back the hidden overlay with the message for an escalation level"""
+        canvas = self.character_canvas
+        headline = OVERLAY_HEADLINES[min(level, len(OVERLAY_HEADLINES) - 1)]
+        canvas.itemconfigure(self.message_item,
+                             text=f"{headline}\nClose {self.detected_target or 'Instagram'} and\nget back to Study!")
+        canvas.itemconfigure(self.instructions_item,
+                             text=f"Click anywhere to dismiss (or wait {format_wait(auto_dismiss)})")
+        self.overlay_window.deiconify()
+        self.overlay_window.attributes('-fullscreen', True)
+        self.overlay_window.attributes('-topmost', True)
+        self.overlay_window.lift()
+        self.overlay_visible = True
+        
+        # Animated elements
+        self.animate_character()
         
+        # Set auto-dismiss timer
+        self.dismiss_timer = self.overlay_window.after(int(auto_dismiss * 1000), self.force_dismiss)
+        
+    def get_overlay_frames(self, screen_width, screen_height):
+        """Overlay frames for a screen size, rendered on first use and kept for the next overlay"""
+        key = (screen_width, screen_height)
+        if key not in self.overlay_frames:
+            from PIL import ImageTk
+            left, top, images, sequence = render_character_frames(screen_width, screen_height)
+            photos = [ImageTk.PhotoImage(image, master=self.root) for image in images]
+            self.overlay_frames[key] = (left, top, photos, sequence)
+        return self.overlay_frames[key]
+
     def draw_focus_character(self):
         """Draw a game-like character with message"""
         canvas = self.character_canvas
@@ -292,107 +2200,76 @@ class FocusModeApp:
         screen_width = canvas.winfo_screenwidth()
         screen_height = canvas.winfo_screenheight()
         
-        # Character position (coming from left)
-        char_x = screen_width // 4
-        char_y = screen_height // 2
-        
-        # Draw character (simple robot-like figure)
-        # Body
-        canvas.create_rectangle(char_x-40, char_y-60, char_x+40, char_y+20, 
-                               fill='#4CAF50', outline='#2E7D32', width=3)
-        
-        # Head
-        canvas.create_oval(char_x-30, char_y-100, char_x+30, char_y-40, 
-                          fill='#66BB6A', outline='#2E7D32', width=3)
-        
-        # Eyes
-        canvas.create_oval(char_x-20, char_y-85, char_x-10, char_y-75, 
-                          fill='white', outline='black')
-        canvas.create_oval(char_x+10, char_y-85, char_x+20, char_y-75, 
-                          fill='white', outline='black')
-        canvas.create_oval(char_x-18, char_y-83, char_x-12, char_y-77, 
-                          fill='black')
-        canvas.create_oval(char_x+12, char_y-83, char_x+18, char_y-77, 
-                          fill='black')
-        
-        # Arms
-        canvas.create_rectangle(char_x-60, char_y-40, char_x-40, char_y-10, 
-                               fill='#4CAF50', outline='#2E7D32', width=2)
-        canvas.create_rectangle(char_x+40, char_y-40, char_x+60, char_y-10, 
-                               fill='#4CAF50', outline='#2E7D32', width=2)
-        
-        # Legs
-        canvas.create_rectangle(char_x-25, char_y+20, char_x-10, char_y+50, 
-                               fill='#4CAF50', outline='#2E7D32', width=2)
-        canvas.create_rectangle(char_x+10, char_y+20, char_x+25, char_y+50, 
-                               fill='#4CAF50', outline='#2E7D32', width=2)
-        
-        # Speech bubble
-        bubble_x = char_x + 100
-        bubble_y = char_y - 80
-        
-        # Bubble background
-        canvas.create_oval(bubble_x-10, bubble_y-60, bubble_x+250, bubble_y+50, 
-                          fill='white', outline='#2E7D32', width=3)
-        
-        # Bubble pointer
-        points = [char_x+60, char_y-60, bubble_x-10, bubble_y-10, bubble_x-10, bubble_y+10]
-        canvas.create_polygon(points, fill='white', outline='#2E7D32', width=2)
-        
-        # Message text
-        canvas.create_text(bubble_x+120, bubble_y-10, 
-                          text="🚫 FOCUS TIME! 🚫\nClose Instagram and\nget back to Study!", 
-                          font=('Arial', 16, 'bold'), 
-                          fill='#D32F2F', justify=tk.CENTER)
+        # Character and speech bubble are one pre-rendered image; only the text is drawn by Tk
+        left, top, photos, sequence = self.get_overlay_frames(screen_width, screen_height)
+        self.character_frames = (photos, sequence)
+        self.character_item = canvas.create_image(left, top, image=photos[sequence[0]], anchor=tk.NW)
         
-        # Animated elements
-        self.animate_character()
+        # Message text, filled in by show_overlay
+        bubble_x = screen_width // 4 + 100
+        bubble_y = screen_height // 2 - 80
+        self.message_item = canvas.create_text(bubble_x+120, bubble_y-10, text="", 
+                                               font=('Arial', 16, 'bold'), 
+                                               fill='#D32F2F', justify=tk.CENTER)
         
         # Instructions
-        canvas.create_text(screen_width//2, screen_height-100, 
-                          text="Click anywhere to dismiss (or wait 1 minute)", 
-                          font=('Arial', 14), fill='#FFB74D', justify=tk.CENTER)
+        self.instructions_item = canvas.create_text(screen_width//2, screen_height-100, text="", 
+                                                    font=('Arial', 14), fill='#FFB74D', justify=tk.CENTER)
         
     def animate_character(self):
-        """Add simple animation to the character"""
-        if not self.overlay_window:
-            return
+        """Bob the character by swapping its image at a steady frame rate"""
+        photos, sequence = self.character_frames
+        self.frame_timer = FrameTimer()
+        started = time.perf_counter()
+        shown = [None]
+        
+        def tick():
+            if not self.overlay_visible:
+                return
+            now = time.perf_counter()
+            # The frame follows the clock, so a late tick skips ahead instead of slowing down
+            frame = sequence[int((now - started) * OVERLAY_FPS) % len(sequence)]
+            if frame != shown[0]:
+                self.character_canvas.itemconfigure(self.character_item, image=photos[frame])
+                shown[0] = frame
+            self.frame_timer.record(now, time.perf_counter())
+            next_frame = started + self.frame_timer.frames / OVERLAY_FPS
+            delay = max(1, int((next_frame - time.perf_counter()) * 1000))
+            self.animation_job = self.overlay_window.after(delay, tick)
             
-        # Simple bouncing animation
-        def bounce():
-            if self.overlay_window:
-                items = self.character_canvas.find_all()
-                for item in items:
-                    self.character_canvas.move(item, 0, -2)
-                self.overlay_window.after(500, lambda: restore())
-                
-        def restore():
-            if self.overlay_window:
-                items = self.character_canvas.find_all()
-                for item in items:
-                    self.character_canvas.move(item, 0, 2)
-                self.overlay_window.after(1000, bounce)
-                
-        bounce()
+        tick()
         
     def dismiss_overlay(self, event=None):
         """Dismiss the overlay when clicked"""
+        # The click reaches both the canvas and the window bindings
+        if not self.overlay_visible:
+            return
+        self.report_event("dismiss", round(time.monotonic() - self.overlay_opened, 2))
         self.close_overlay()
         
     def force_dismiss(self):
-        """Force dismiss after 1 minute"""
+        """Force dismiss when the auto-dismiss time is up"""
+        self.dismiss_timer = None
+        self.report_event("force_dismiss", round(time.monotonic() - self.overlay_opened, 2))
         self.close_overlay()
         
     def close_overlay(self):
-        """Close the overlay window"""
+        """Hide the overlay window, keeping it for the next intervention"""
         if self.dismiss_timer:
             self.overlay_window.after_cancel(self.dismiss_timer)
             self.dismiss_timer = None
             
-        if self.overlay_window:
-            self.overlay_window.destroy()
-            self.overlay_window = None
-            self.character_canvas = None
+        if self.animation_job:
+            self.overlay_window.after_cancel(self.animation_job)
+            self.animation_job = None
+            try:
+                self.monitor.command("animation " + self.frame_timer.summary())
+            except (OSError, ValueError, concurrent.futures.TimeoutError) as e:
+                print(f"Could not report the overlay animation: {e}")
+            
+        if self.overlay_visible:
+            self.overlay_window.withdraw()
+            self.overlay_visible = False
             
     def run(self):
         """Start the application"""
@@ -400,11 +2277,57 @@ class FocusModeApp:
         self.root.mainloop()
         
     def on_closing(self):
-        """Clean up when closing the app"""
-        self.stop_focus_mode()
+        """Clean up when closing the app; a headless monitor we attached to keeps running"""
+        if self.overlay_visible:
+            self.close_overlay()
+        self.monitor.close()
         self.root.destroy()
 
 if __name__ == "__main__":
+    if "--startup-probe" in sys.argv:
+        # Launched by --startup-report: say when the controller window is up, then exit
+        try:
+            FocusModeApp().root.update()
+            shown = "visible window"
+        except tk.TclError:
+            shown = "window creation (no display)"
+        print("ready", time.time(), shown)
+        sys.exit(0)
+    if "--daemon" in sys.argv:
+        sys.exit(run_daemon(start_active="--on" in sys.argv))
+    if "--ctl" in sys.argv:
+        # e.g. --ctl status or --ctl report hour: one command to the headless monitor, reply printed as JSON
+        try:
+            command = " ".join(sys.argv[sys.argv.index("--ctl") + 1:])
+            print(json.dumps(ControlClient().command(command), indent=2))
+        except (IndexError, OSError, ValueError) as e:
+            print(f"Could not reach the monitor: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    if "--startup-report" in sys.argv:
+        startup_report()
+        sys.exit(0)
+    if "--benchmark-detection" in sys.argv:
+        benchmark_detection()
+        sys.exit(0)
+    if "--benchmark-helper" in sys.argv:
+        benchmark_window_helper()
+        sys.exit(0)
+    if "--benchmark-processes" in sys.argv:
+        benchmark_process_scan()
+        sys.exit(0)
+    if "--benchmark-rules" in sys.argv:
+        benchmark_rules()
+        sys.exit(0)
+    if "--benchmark-detectors" in sys.argv:
+        benchmark_detectors()
+        sys.exit(0)
+    if "--benchmark-telemetry" in sys.argv:
+        benchmark_telemetry()
+        sys.exit(0)
+    if "--benchmark-overlay" in sys.argv:
+        benchmark_overlay()
+        sys.exit(0)
     try:
         app = FocusModeApp()
         app.run()
@@ -3,64 +3,483 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import StaleElementReferenceException
 from pathlib import Path
+from functools import partial
+import http.server
+import threading
+import tracemalloc
+import sqlite3
+import json
+import csv
+import os
 import time
 import sys
 
-# Set up Chrome options
-chrome_options = webdriver.ChromeOptions()
+CHAT_URL = "https://web.telegram.org/k/#@Prayas_2_0_JEE_2024_lec"  # Replace with your group link
 user_data_dir = Path(r"C:/Users/RajeshShukla/AppData/Local/Google/Chrome/User Data/Profile 1")
-chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-chrome_options.add_argument("--profile-directory=Scraper")
-
-# Initialize the driver
-driver = webdriver.Chrome(options=chrome_options)
-driver.get("https://web.telegram.org/k/#@Prayas_2_0_JEE_2024_lec")  # Replace with your group link
-
-def scroll_to_top(element, driver, max_tries=100):
-    """Scrolls the element to the top."""
-    for _ in range(max_tries):
-        driver.execute_script("arguments[0].scrollTop = 0;", element)
-        time.sleep(0.1)
-        # Optionally, break if already at top
-
-def is_on_top(text):
-    """Checks if the chat is at the top."""
-    lines = text.strip().split('\n')
-    if len(lines) > 4 and lines[4] == "1":
-        return True
-    return False
-
-def main():
-    DATA = {}
 
-    # Wait for chat column to load
-    wait = WebDriverWait(driver, 30)
-    chat = wait.until(EC.presence_of_element_located((By.ID, "column-center")))
-    scrollable = chat.find_element(By.CLASS_NAME, "scrollable")
+def create_driver(headless=False):
+    """Starts Chrome, with the logged-in profile unless headless (used by the benchmark)"""
+    chrome_options = webdriver.ChromeOptions()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    else:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+        chrome_options.add_argument("--profile-directory=Scraper")
+    return webdriver.Chrome(options=chrome_options)
+
+# Scroll position of arguments[0] and the id of the oldest bubble rendered in arguments[1]
+HISTORY_STATE_SCRIPT = """
+const [scrollable, chat] = arguments;
+const oldest = chat.querySelector('.bubble[data-mid]');
+return [Math.round(scrollable.scrollTop), oldest ? oldest.dataset.mid : null];
+"""
+
+class HistoryEnd:
+    """Tells when scrolling up stops loading older messages.
+
+    Every check transfers only the scroll position and the oldest message
+    id, whatever the size of the chat. The top is reached once the chat
+    has stayed scrolled to 0 with the same oldest message for settle seconds.
+    """
+
+    def __init__(self, driver, chat, scrollable, settle=5.0):
+        self.driver = driver
+        self.chat = chat
+        self.scrollable = scrollable
+        self.settle = settle
+        self.state = None
+        self.since = None
+
+    def reached(self):
+        top, oldest = self.driver.execute_script(HISTORY_STATE_SCRIPT, self.scrollable, self.chat)
+        now = time.monotonic()
+        if top != 0 or (top, oldest) != self.state:
+            self.state = (top, oldest)
+            self.since = now
+            return False
+        return now - self.since >= self.settle
+
+# Message bubbles carry their Telegram message id; harvested ones are marked so they are not returned again
+NEW_BUBBLES = ".bubble[data-mid]:not([data-harvested])"
+SEPARATOR = "-" * 45
 
+def harvest_new_messages(chat, driver, data, seen, dates):
+    """Reads only the bubbles not harvested yet into data (message id -> date and text).
+
+    seen holds every message id read so far, so a bubble that Telegram
+    re-renders (losing its mark) is still skipped. dates caches the date
+    label of each date group. Returns the ids of the new messages.
+    """
+    new_ids = []
+    harvested = []
+    for bubble in chat.find_elements(By.CSS_SELECTOR, NEW_BUBBLES):
+        try:
+            mid = bubble.get_attribute("data-mid")
+            if mid not in seen:
+                group = bubble.find_element(By.XPATH, "./ancestor::div[contains(@class, 'bubbles-date-group')]")
+                if group.id not in dates:
+                    dates[group.id] = group.find_element(By.CLASS_NAME, "is-date").text.strip()
+                seen.add(mid)
+                data[mid] = {"date": dates[group.id], "text": bubble.text.strip()}
+                new_ids.append(mid)
+        except StaleElementReferenceException:
+            # Removed while we read it; if it is rendered again it will be picked up then
+            continue
+        harvested.append(bubble)
+    mark_harvested(driver, harvested)
+    return new_ids
+
+# Page-side reader shared by the scripts below: one bubble as a row, marking it harvested
+BUBBLE_ROW_JS = """
+function bubbleRow(bubble) {
+    bubble.setAttribute('data-harvested', '');
+    const dateGroup = bubble.closest('.bubbles-date-group');
+    const date = dateGroup && dateGroup.querySelector('.is-date');
+    const group = bubble.closest('.bubble-group');
+    const sender = bubble.querySelector('.peer-title') || (group && group.querySelector('.peer-title'));
+    const message = bubble.querySelector('.message') || bubble;
+    const time = message.querySelector('.time');
+    let text = message.innerText;
+    if (time && text.endsWith(time.innerText)) {
+        text = text.slice(0, text.length - time.innerText.length);
+    }
+    return {
+        mid: bubble.dataset.mid,
+        date: date ? date.innerText.trim() : '',
+        sender: sender ? sender.innerText.trim() : null,
+        timestamp: bubble.dataset.timestamp ? Number(bubble.dataset.timestamp) : null,
+        text: text.trim(),
+    };
+}
+"""
+
+# Reads up to arguments[1] new bubbles of the chat in arguments[0] and marks them, all inside the page
+EXTRACT_SCRIPT = BUBBLE_ROW_JS + """
+const [chat, limit] = arguments;
+const rows = [];
+for (const bubble of chat.querySelectorAll('.bubble[data-mid]:not([data-harvested])')) {
+    if (rows.length >= limit) break;
+    rows.push(bubbleRow(bubble));
+}
+return JSON.stringify(rows);
+"""
+
+def extract_new_messages(chat, driver, data, seen, batch=500):
+    """Like harvest_new_messages, but with one execute_script call per batch of new bubbles.
+
+    Each message is stored with its date, sender, timestamp and text.
+    """
+    new_ids = []
     while True:
-        driver.execute_script("arguments[0].scrollBy(0, -100);", scrollable)
-        date_groups = chat.find_elements(By.CLASS_NAME, "bubbles-date-group")
-        for group in date_groups:
-            date = group.find_element(By.CLASS_NAME, "is-date").text.strip()
-            messages = group.find_elements(By.CLASS_NAME, "bubble-group")
-            for message in messages:
-                msg_text = message.text.strip()
-                if "-" * 45 in msg_text:
-                    print(msg_text.split('\n')[0])
-        time.sleep(0.1)
-        if is_on_top(chat.text):
-            break
+        rows = json.loads(driver.execute_script(EXTRACT_SCRIPT, chat, batch))
+        for row in rows:
+            mid = row.pop("mid")
+            if mid not in seen:
+                seen.add(mid)
+                data[mid] = row
+                new_ids.append(mid)
+        if len(rows) < batch:
+            return new_ids
+
+# Watches the chat in arguments[0] and reads every bubble as soon as it is inserted, so a bubble
+# that is removed again before Python asks for it is not lost
+INSTALL_CAPTURE_SCRIPT = BUBBLE_ROW_JS + """
+const chat = arguments[0];
+if (window.scraperCapture) window.scraperCapture.observer.disconnect();
+const capture = window.scraperCapture = {chat: chat, buffer: [], lastInsert: 0};
+capture.observer = new MutationObserver(mutations => {
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeType !== Node.ELEMENT_NODE) continue;
+            const bubbles = node.matches('.bubble[data-mid]') ? [node] : node.querySelectorAll('.bubble[data-mid]');
+            for (const bubble of bubbles) {
+                if (!bubble.hasAttribute('data-harvested')) {
+                    capture.buffer.push(bubbleRow(bubble));
+                    capture.lastInsert = performance.now();
+                }
+            }
+        }
+    }
+});
+capture.observer.observe(chat, {childList: true, subtree: true});
+"""
+
+# Waits in the page until captured bubbles have stopped arriving for arguments[1] ms (or
+# arguments[2] ms have passed), then hands over up to arguments[0] of them. Reports the
+# capture as lost if Telegram reloaded the page or replaced the chat it watches.
+DRAIN_CAPTURE_SCRIPT = """
+const [limit, quietMs, timeoutMs, done] = arguments;
+const started = performance.now();
+(function check() {
+    const capture = window.scraperCapture;
+    if (!capture || !capture.chat.isConnected) {
+        const rows = capture ? capture.buffer.splice(0) : [];
+        done(JSON.stringify({rows: rows, pending: 0, lost: true}));
+        return;
+    }
+    const now = performance.now();
+    const settled = capture.buffer.length > 0 && now - capture.lastInsert >= quietMs;
+    if (settled || now - started >= timeoutMs) {
+        const rows = capture.buffer.splice(0, limit);
+        done(JSON.stringify({rows: rows, pending: capture.buffer.length}));
+    } else {
+        setTimeout(check, 20);
+    }
+})();
+"""
+
+def install_capture(driver, chat, timeout=10.0):
+    """Starts collecting bubbles in the page as Telegram inserts them"""
+    driver.set_script_timeout(timeout + 5)
+    driver.execute_script(INSTALL_CAPTURE_SCRIPT, chat)
+
+def drain_capture(driver, data, seen, quiet=0.15, timeout=10.0, batch=500):
+    """Waits for the history page requested by the last scroll and stores its messages in data.
+
+    Returns the new message ids, and whether the capture was lost because
+    Telegram replaced the chat, as soon as the page has arrived and stopped
+    changing for quiet seconds, or with nothing after timeout seconds.
+    """
+    new_ids = []
+    wait = timeout
+    while True:
+        result = json.loads(driver.execute_async_script(DRAIN_CAPTURE_SCRIPT, batch, quiet * 1000, wait * 1000))
+        for row in result["rows"]:
+            mid = row.pop("mid")
+            if mid not in seen:
+                seen.add(mid)
+                data[mid] = row
+                new_ids.append(mid)
+        if result.get("lost") or not result["pending"]:
+            return new_ids, bool(result.get("lost"))
+        wait = 0
+
+def mark_harvested(driver, bubbles):
+    """Marks bubbles with one script call, or one by one if some were removed meanwhile"""
+    if not bubbles:
+        return
+    mark = "for (const e of arguments[0]) e.setAttribute('data-harvested', '');"
+    try:
+        driver.execute_script(mark, bubbles)
+    except StaleElementReferenceException:
+        for bubble in bubbles:
+            try:
+                driver.execute_script(mark, [bubble])
+            except StaleElementReferenceException:
+                pass
+
+# Sinks write each message as soon as it is harvested, so nothing has to stay in memory
+MESSAGE_FIELDS = ["mid", "date", "sender", "timestamp", "text"]
+
+class FileSink:
+    """An appended text file synced to disk every sync_every messages; subclasses format the lines"""
+
+    def __init__(self, path, sync_every=1000, newline=None):
+        self.file = open(path, 'a', encoding='utf-8', newline=newline)
+        self.sync_every = sync_every
+        self.unsynced = 0
+
+    def write(self, mid, message):
+        self.write_message(mid, message)
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class JsonlSink(FileSink):
+    """One JSON object per line"""
 
-    print("Chat Captured")
-    print(chat.text)
+    def write_message(self, mid, message):
+        self.file.write(json.dumps({"mid": mid, **message}, ensure_ascii=False) + "\n")
+
+class CsvSink(FileSink):
+    """A CSV file with a header row; per-element harvesting leaves sender and timestamp empty"""
+
+    def __init__(self, path, sync_every=1000):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        super().__init__(path, sync_every, newline='')
+        self.writer = csv.writer(self.file)
+        if new_file:
+            self.writer.writerow(MESSAGE_FIELDS)
+
+    def write_message(self, mid, message):
+        self.writer.writerow([mid] + [message.get(field) for field in MESSAGE_FIELDS[1:]])
+
+class SqliteSink:
+    """An SQLite database written in batches, with an FTS5 index over the message text.
+
+    Messages already in the database are skipped, so an interrupted export
+    can be resumed into the same file. Search with, for example:
+    SELECT date, text FROM messages WHERE id IN
+        (SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'lecture')
+    """
+
+    def __init__(self, path, batch=1000):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY, mid TEXT UNIQUE, "
+                        "date TEXT, sender TEXT, timestamp INTEGER, text TEXT)")
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING "
+                            "fts5(text, sender, content='messages', content_rowid='id')")
+            self.db.execute("CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+                            "INSERT INTO messages_fts(rowid, text, sender) VALUES (new.id, new.text, new.sender); END")
+        except sqlite3.OperationalError as e:
+            print(f"Full-text index unavailable ({e}), writing messages without it", file=sys.stderr)
+        self.db.commit()
+        self.batch = batch
+        self.pending = []
+
+    def write(self, mid, message):
+        self.pending.append((mid, message.get("date"), message.get("sender"),
+                             message.get("timestamp"), message.get("text")))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO messages (mid, date, sender, timestamp, text) "
+                                "VALUES (?, ?, ?, ?, ?)", self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+def open_sink(path):
+    """Picks the sink from the file extension: .jsonl, .csv or .db/.sqlite"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return JsonlSink(path)
+    if extension == ".csv":
+        return CsvSink(path)
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        return SqliteSink(path)
+    raise ValueError(f"Unknown export format: {path} (use .jsonl, .csv or .db)")
+
+def print_separators(data, new_ids):
+    """Prints the first line of the new messages that contain the separator"""
+    for mid in new_ids:
+        msg_text = data[mid]["text"]
+        if SEPARATOR in msg_text:
+            print(msg_text.split('\n')[0])
+
+def main(driver, output=None, stream=False, per_element=False):
+    DATA = {}
+    seen = set()
+    dates = {}
+    sink = open_sink(output) if output else None
+    try:
+        capture_chat(driver, DATA, seen, dates, sink, stream, per_element)
+    finally:
+        if sink:
+            sink.close()
+
+    if sink:
+        print(f"Chat Captured: {len(seen)} messages, written to {output}")
+    else:
+        print(f"Chat Captured: {len(DATA)} messages")
+        for mid in sorted(DATA, key=float):
+            print(f"[{DATA[mid]['date']}] {DATA[mid]['text']}")
     input("Press Enter to exit...")
     driver.quit()
 
+def export_new(data, new_ids, sink):
+    """Prints the separator messages and, with a sink, moves the new messages out of data into it"""
+    print_separators(data, new_ids)
+    if sink:
+        for mid in new_ids:
+            sink.write(mid, data.pop(mid))
+
+def capture_chat(driver, DATA, seen, dates, sink, stream=False, per_element=False):
+    """Scrolls up through the whole chat, collecting messages into DATA or the sink.
+
+    stream selects the MutationObserver capture, per_element the one-element-at-a-time reader.
+    """
+    lost = True
+    while True:
+        if lost:
+            # Wait for chat column to load; again after Telegram replaced it
+            wait = WebDriverWait(driver, 30)
+            chat = wait.until(EC.presence_of_element_located((By.ID, "column-center")))
+            scrollable = chat.find_element(By.CLASS_NAME, "scrollable")
+            history_end = HistoryEnd(driver, chat, scrollable)
+            lost = False
+            if stream:
+                install_capture(driver, chat)
+                # The bubbles already on screen; the capture only sees later ones
+                export_new(DATA, extract_new_messages(chat, driver, DATA, seen), sink)
+
+        if stream:
+            # Ask for the next history page only once the previous one has arrived
+            driver.execute_script("arguments[0].scrollTop = 0;", scrollable)
+            new_ids, lost = drain_capture(driver, DATA, seen)
+        else:
+            driver.execute_script("arguments[0].scrollBy(0, -100);", scrollable)
+            if per_element:
+                new_ids = harvest_new_messages(chat, driver, DATA, seen, dates)
+            else:
+                new_ids = extract_new_messages(chat, driver, DATA, seen)
+        export_new(DATA, new_ids, sink)
+        if lost:
+            continue
+        if not stream:
+            time.sleep(0.1)
+        if history_end.reached():
+            break
+
+# Copies the fixture's bubble groups until the chat holds arguments[0] bubbles, with fresh message ids
+GROW_FIXTURE_SCRIPT = """
+const count = arguments[0];
+const samples = [...document.querySelectorAll('.bubble-group')];
+let total = document.querySelectorAll('.bubble[data-mid]').length;
+let mid = 1000;
+for (let i = 0; total < count; i++) {
+    const sample = samples[i % samples.length];
+    const copy = sample.cloneNode(true);
+    for (const bubble of copy.querySelectorAll('.bubble[data-mid]')) {
+        bubble.dataset.mid = String(mid++);
+        total++;
+    }
+    sample.parentNode.appendChild(copy);
+}
+return total;
+"""
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the fixture without logging every request"""
+
+    def log_message(self, format, *args):
+        pass
+
+def benchmark_extraction(counts=(500, 2000)):
+    """Compares per-element WebDriver reads with one-script extraction on the local fixture"""
+    fixtures = Path(__file__).resolve().with_name("fixtures")
+    handler = partial(QuietHandler, directory=str(fixtures))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/telegram_web_k.html"
+    bench_driver = create_driver(headless=True)
+    try:
+        for count in counts:
+            for mode, harvest in (("per-element", lambda chat, data, seen: harvest_new_messages(chat, bench_driver, data, seen, {})),
+                                  ("one script", lambda chat, data, seen: extract_new_messages(chat, bench_driver, data, seen))):
+                bench_driver.get(url)
+                bubbles = bench_driver.execute_script(GROW_FIXTURE_SCRIPT, count)
+                chat = bench_driver.find_element(By.ID, "column-center")
+                data = {}
+                start = time.perf_counter()
+                harvest(chat, data, set())
+                elapsed = time.perf_counter() - start
+                print(f"{bubbles} bubbles, {mode}: {elapsed:.2f} s, {len(data) / elapsed:.0f} messages/s")
+    finally:
+        bench_driver.quit()
+        server.shutdown()
+
+def benchmark_export(count=500_000, directory="."):
+    """Writes count synthetic messages to each sink, showing time and peak Python memory"""
+    text = "Lecture notes for chapter {0} are uploaded, see the pinned message for chapter {0}"
+    for name in ("benchmark.jsonl", "benchmark.csv", "benchmark.db"):
+        path = os.path.join(directory, name)
+        for stale in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        tracemalloc.start()
+        start = time.perf_counter()
+        sink = open_sink(path)
+        for i in range(count):
+            sink.write(str(i), {"date": "June 1", "sender": "Prayas 2.0", "timestamp": 1717200000 + i,
+                                "text": text.format(i)})
+        sink.close()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>16}: {elapsed:6.2f} s, {count / elapsed:8.0f} messages/s, "
+              f"peak {peak / 1e6:5.2f} MB, file {os.path.getsize(path) / 1e6:6.1f} MB")
+        os.remove(path)
+
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_extraction()
+        sys.exit(0)
+    if "--benchmark-export" in sys.argv:
+        benchmark_export()
+        sys.exit(0)
+    output = sys.argv[sys.argv.index("--output") + 1] if "--output" in sys.argv else None
+    driver = create_driver()
+    driver.get(CHAT_URL)
     try:
-        main()
+        main(driver, output, "--stream" in sys.argv, "--per-element" in sys.argv)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         driver.quit()
\ No newline at end of file
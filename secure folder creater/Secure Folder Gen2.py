@@ -15,7 +15,7 @@ Key Improvements in Gen 2:
 - Better cross-platform support for secure storage locations
 
 Requirements:
-- Python 3.6+
+- Python 3.8+
 - tkinter (usually included with Python)
 - pywin32 (Windows only): pip install pywin32
 
@@ -43,10 +43,24 @@ from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
 import shutil
 import hashlib
+import hmac
+import itertools
 import json
 import platform
 import subprocess
 import time
+import errno
+import queue
+import tempfile
+import threading
+import sqlite3
+import struct
+import secrets
+import mimetypes
+import urllib.parse
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Windows-specific imports (optional)
@@ -56,7 +70,1562 @@ if platform.system() == "Windows":
     except ImportError:
         install_and_restart("pywin32", "pywin32")
 
+# Encryption at rest (optional, installed when encrypted storage is first enabled)
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.exceptions import InvalidTag
+except ImportError:
+    AESGCM = None
+    InvalidTag = ValueError
+
+# Read size used for streaming copies and verification
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Errors that mean copy_file_range is unusable here (old kernel, cross-device, FS support)
+_COPY_RANGE_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                               errno.EBADF, errno.EPERM}
+
+
+def fast_copy_file(source_path, dest_path):
+    """Copy a file with the kernel copy path when available and keep its metadata"""
+    copied = False
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source_path, 'rb') as fsrc, open(dest_path, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if sent == 0:
+                        break
+                    remaining -= sent
+                copied = remaining == 0
+        except OSError as e:
+            if e.errno not in _COPY_RANGE_FALLBACK_ERRNOS:
+                raise
+    if not copied:
+        # shutil already uses sendfile/fcopyfile where the platform supports it
+        shutil.copyfile(source_path, dest_path)
+    shutil.copystat(source_path, dest_path)
+
+
+def files_match(source_path, dest_path, chunk_size=COPY_CHUNK_SIZE):
+    """Compare two files chunk by chunk without loading either one fully"""
+    if os.path.getsize(source_path) != os.path.getsize(dest_path):
+        return False
+    with open(source_path, 'rb') as fsrc, open(dest_path, 'rb') as fdst:
+        while True:
+            a = fsrc.read(chunk_size)
+            b = fdst.read(chunk_size)
+            if a != b:
+                return False
+            if not a:
+                return True
+
+
+class MigrationEngine:
+    """Copy a Gen 1 vault into a Gen 2 vault on a thread pool.
+
+    Completed files are appended to a journal so an interrupted run resumes
+    where it stopped. Progress is reported through ``progress_queue`` in
+    batches, so the Tk thread only has to poll it.
+    """
+
+    BATCH_SIZE = 256
+
+    def __init__(self, source_dir, dest_dir, journal_path, workers=None, verify=True, index=None):
+        self.source_dir = source_dir
+        self.dest_dir = dest_dir
+        self.journal_path = journal_path
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.verify = verify
+        self.index = index
+        self.dirs = []
+        self.progress_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.total = 0
+        self.completed = 0
+        self.failures = []
+
+    @staticmethod
+    def read_journal(journal_path):
+        """Return (header, completed relative paths) from an existing journal"""
+        header = None
+        done = set()
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    if not line:
+                        continue
+                    if header is None:
+                        header = json.loads(line)
+                    else:
+                        done.add(line)
+        except (OSError, ValueError):
+            return None, set()
+        return header, done
+
+    def scan(self):
+        """Walk the source once, recreating directories and listing files"""
+        files = []
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            self.dirs.append(rel_dir)
+            os.makedirs(os.path.join(self.dest_dir, rel_dir), exist_ok=True)
+            with os.scandir(os.path.join(self.source_dir, rel_dir)) as it:
+                for entry in it:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file():
+                        files.append(rel_path)
+        return files
+
+    def copy_batch(self, rel_paths):
+        """Copy and verify a batch of files; runs on a worker thread"""
+        results = []
+        for rel_path in rel_paths:
+            if self.cancel_event.is_set():
+                break
+            source_file = os.path.join(self.source_dir, rel_path)
+            dest_file = os.path.join(self.dest_dir, rel_path)
+            try:
+                fast_copy_file(source_file, dest_file)
+                if self.verify and not files_match(source_file, dest_file):
+                    raise IOError("verification failed")
+                results.append((rel_path, None))
+            except Exception as e:
+                results.append((rel_path, str(e)))
+        return results
+
+    def start(self):
+        """Run the migration in a background thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop after the batches currently being copied; the journal keeps progress"""
+        self.cancel_event.set()
+
+    def run(self):
+        """Scan, copy and journal the whole vault, reporting through progress_queue"""
+        try:
+            header, done = self.read_journal(self.journal_path)
+            if not header or header.get('source') != self.source_dir:
+                done = set()
+                with open(self.journal_path, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps({'source': self.source_dir, 'dest': self.dest_dir}) + "\n")
+
+            pending = [p for p in self.scan() if p not in done]
+            self.total = len(pending) + len(done)
+            self.completed = len(done)
+            self.progress_queue.put(('progress', self.completed, self.total))
+
+            batches = [pending[i:i + self.BATCH_SIZE]
+                       for i in range(0, len(pending), self.BATCH_SIZE)]
+            with open(self.journal_path, 'a', encoding='utf-8') as journal, \
+                    ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(self.copy_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    copied = []
+                    for rel_path, error in future.result():
+                        if error:
+                            self.failures.append((rel_path, error))
+                        else:
+                            copied.append(rel_path)
+                    if copied:
+                        journal.write("\n".join(copied) + "\n")
+                        journal.flush()
+                        os.fsync(journal.fileno())
+                        if self.index:
+                            self.index.record_files(copied)
+                    self.completed += len(copied)
+                    self.progress_queue.put(('progress', self.completed, self.total))
+                    if self.cancel_event.is_set():
+                        for f in futures:
+                            f.cancel()
+
+            if self.cancel_event.is_set():
+                self.progress_queue.put(('cancelled', self.completed, self.total))
+            else:
+                # After a resumed run some files may predate the index; leave those folders
+                # to the index's lazy reconciliation instead of marking them as scanned
+                if self.index and not done:
+                    self.index.record_dirs(self.dirs)
+                self.progress_queue.put(('done', self.completed, self.total))
+        except Exception as e:
+            self.progress_queue.put(('error', str(e), self.total))
+
+
+class IngestPipeline:
+    """Add files and whole folder trees to the vault on a pool of worker threads.
+
+    A producer walks the sources and queues every file as soon as it is found,
+    while the workers store them through ``store(source_path, rel_path)``.
+    Stored files are written to the index in batches. Failures are collected
+    for one report at the end instead of interrupting the run, and
+    ``status()`` gives live throughput and an ETA for the progress dialog.
+    """
+
+    BATCH_SIZE = 256
+    RATE_WINDOW = 5.0
+
+    def __init__(self, targets, dest_dir, store, workers=None, index=None, block_store=None):
+        self.targets = targets
+        self.dest_dir = dest_dir
+        self.store = store
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 4)
+        self.index = index
+        self.block_store = block_store
+        self.dirs = []
+        self.progress_queue = queue.Queue()
+        self.work_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.scanning = True
+        self.total = 0
+        self.total_bytes = 0
+        self.completed = 0
+        self.completed_bytes = 0
+        self.failures = []
+        self.pending_records = []
+        self.samples = deque()
+
+    def start(self):
+        """Run the import in a background thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop after the files currently being stored"""
+        self.cancel_event.set()
+
+    def join(self):
+        """Wait until the workers have stopped"""
+        if self.thread is not None:
+            self.thread.join()
+
+    def fail(self, path, error):
+        with self.lock:
+            self.failures.append((path, str(error)))
+
+    def enqueue(self, source_path, rel_path, size):
+        with self.lock:
+            self.total += 1
+            self.total_bytes += size
+        self.work_queue.put((source_path, rel_path, size))
+
+    def scan(self):
+        """Walk the sources, recreating folders and queueing files as they are found"""
+        for source_path, rel_target in self.targets:
+            if self.cancel_event.is_set():
+                return
+            if not os.path.isdir(source_path):
+                try:
+                    self.enqueue(source_path, rel_target, os.path.getsize(source_path))
+                except OSError as e:
+                    self.fail(source_path, e)
+                continue
+            stack = [(source_path, rel_target)]
+            while stack and not self.cancel_event.is_set():
+                source_dir, rel_dir = stack.pop()
+                try:
+                    os.makedirs(os.path.join(self.dest_dir, rel_dir), exist_ok=True)
+                    self.dirs.append(rel_dir)
+                    with os.scandir(source_dir) as it:
+                        for entry in it:
+                            rel_path = os.path.join(rel_dir, entry.name)
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, rel_path))
+                            elif entry.is_file():
+                                self.enqueue(entry.path, rel_path, entry.stat().st_size)
+                except OSError as e:
+                    self.fail(source_dir, e)
+
+    def work(self):
+        """Store queued files until the producer is done; runs on a worker thread"""
+        while True:
+            item = self.work_queue.get()
+            if item is None:
+                return
+            if self.cancel_event.is_set():
+                continue
+            source_path, rel_path, size = item
+            try:
+                recorded = self.store(source_path, rel_path)
+            except Exception as e:
+                self.fail(source_path, e)
+                continue
+            with self.lock:
+                self.completed += 1
+                self.completed_bytes += size
+                if recorded:
+                    self.pending_records.append(recorded)
+                flush = self.completed % self.BATCH_SIZE == 0
+            if flush:
+                self.flush()
+
+    def flush(self):
+        """Write the files stored since the last flush to the index and manifest"""
+        with self.lock:
+            records, self.pending_records = self.pending_records, []
+        if records and self.index:
+            self.index.record_files(records)
+        if self.block_store:
+            with self.block_store.lock:
+                self.block_store.save()
+
+    def run(self):
+        """Scan and store everything, reporting the outcome through progress_queue"""
+        try:
+            threads = [threading.Thread(target=self.work, daemon=True) for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+            try:
+                self.scan()
+            finally:
+                self.scanning = False
+                for _ in threads:
+                    self.work_queue.put(None)
+                for thread in threads:
+                    thread.join()
+                self.flush()
+            # Failed files were cleaned up by store, so the new folders' listings are final
+            if self.index and self.dirs:
+                self.index.record_dirs(self.dirs)
+            kind = 'cancelled' if self.cancel_event.is_set() else 'done'
+            self.progress_queue.put((kind, self.completed, self.total))
+        except Exception as e:
+            self.progress_queue.put(('error', str(e), self.total))
+
+    def status(self):
+        """Return (files done, files found, bytes done, bytes found, bytes/s, seconds left or None)"""
+        now = time.monotonic()
+        with self.lock:
+            completed, total = self.completed, self.total
+            completed_bytes, total_bytes = self.completed_bytes, self.total_bytes
+        self.samples.append((now, completed_bytes))
+        while len(self.samples) > 2 and now - self.samples[0][0] > self.RATE_WINDOW:
+            self.samples.popleft()
+        elapsed = now - self.samples[0][0]
+        rate = (completed_bytes - self.samples[0][1]) / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if not self.scanning and rate > 0:
+            eta = (total_bytes - completed_bytes) / rate
+        return completed, total, completed_bytes, total_bytes, rate, eta
+
+
+class NameIndex:
+    """Hand out unique display names without probing the disk.
+
+    Keeps the set of names in use plus the next free ``_N`` suffix for each
+    base name, so adding many copies of ``report.pdf`` is O(1) per copy.
+    """
+
+    def __init__(self, names=()):
+        self.lock = threading.Lock()
+        self.names = set(names)
+        self.counters = {}
+
+    def claim(self, filename):
+        """Reserve and return a free name derived from filename"""
+        with self.lock:
+            name = filename
+            if name in self.names:
+                base_name, ext = os.path.splitext(filename)
+                counter = self.counters.get(filename, 1)
+                while name in self.names:
+                    name = f"{base_name}_{counter}{ext}"
+                    counter += 1
+                self.counters[filename] = counter
+            self.names.add(name)
+            return name
+
+    def release(self, name):
+        """Forget a name after its file was deleted"""
+        with self.lock:
+            self.names.discard(name)
+
+
+class BlockStore:
+    """Content-addressed, deduplicating storage inside a vault folder.
+
+    Files are cut into fixed-size chunks which are stored once under their
+    SHA-256 digest in ``.blocks``. ``.manifest.json`` maps each visible file
+    name to its chunk list, so storing identical content again only costs
+    a hash pass. Chunks that lose their last reference are only deleted
+    after the manifest without them has been saved, so a crash in between
+    leaves unused chunks behind but never a manifest pointing at missing ones.
+    """
+
+    CHUNK_SIZE = 4 * 1024 * 1024
+    BLOCKS_DIR = ".blocks"
+    MANIFEST = ".manifest.json"
+
+    def __init__(self, root, trash=None):
+        self.root = root
+        self.trash = trash
+        self.blocks_dir = os.path.join(root, self.BLOCKS_DIR)
+        self.manifest_path = os.path.join(root, self.MANIFEST)
+        self.lock = threading.RLock()
+        self.files = {}
+        self.refcounts = {}
+        self.unreferenced = set()
+        # Chunks referenced but possibly not on disk yet, while a writer is storing them
+        self.pending = set()
+        self.stored_bytes = 0
+        self.load()
+
+    def load(self):
+        """Read the manifest and rebuild chunk reference counts"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                self.files = json.load(f).get('files', {})
+        except (OSError, ValueError):
+            self.files = {}
+        self.refcounts = {}
+        self.unreferenced = set()
+        self.stored_bytes = 0
+        for entry in self.files.values():
+            for digest, size in zip(entry['chunks'], self.chunk_sizes(entry)):
+                if digest not in self.refcounts:
+                    self.stored_bytes += size
+                self.refcounts[digest] = self.refcounts.get(digest, 0) + 1
+
+    def chunk_sizes(self, entry):
+        """Sizes of a file's chunks; only the last one can be short"""
+        count = len(entry['chunks'])
+        if not count:
+            return []
+        return [self.CHUNK_SIZE] * (count - 1) + [entry['size'] - (count - 1) * self.CHUNK_SIZE]
+
+    def save(self):
+        """Write the manifest atomically, then delete the chunks it no longer references"""
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'files': self.files}, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self.delete_unreferenced()
+
+    def delete_unreferenced(self):
+        """Hand chunks without references to the trash, or unlink them without one"""
+        for digest in self.unreferenced:
+            if digest in self.refcounts:
+                # Stored again since it was released
+                continue
+            path = self.chunk_path(digest)
+            try:
+                if self.trash is not None:
+                    self.trash.discard(os.path.relpath(path, self.trash.root))
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.unreferenced = set()
+
+    def release(self, chunks, sizes):
+        """Drop one reference to each chunk; unreferenced ones are deleted by the next save"""
+        for digest, size in zip(chunks, sizes):
+            self.refcounts[digest] -= 1
+            if self.refcounts[digest] == 0:
+                del self.refcounts[digest]
+                self.stored_bytes -= size
+                self.unreferenced.add(digest)
+
+    def chunk_path(self, digest):
+        """Location of a stored chunk, fanned out by the first two hex digits"""
+        return os.path.join(self.blocks_dir, digest[:2], digest)
+
+    def write_chunk(self, digest, data):
+        """Store a chunk unless an identical one is already present"""
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def add(self, name, source_path, save=True):
+        """Hash source_path as a stream and record it under name.
+
+        Bulk imports pass save=False and write the manifest once per batch.
+        If reading or storing fails, the references taken so far are dropped
+        again and the chunks written for this file go with the next save.
+        """
+        chunks = []
+        sizes = []
+        try:
+            with open(source_path, 'rb') as f:
+                for data in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    digest = hashlib.sha256(data).hexdigest()
+                    # Only the reference is taken under the lock; the chunk is written
+                    # outside it. Whoever takes a chunk that is still pending writes it
+                    # too, so a file never ends up relying on a writer that failed.
+                    with self.lock:
+                        if digest not in self.refcounts:
+                            self.stored_bytes += len(data)
+                            self.pending.add(digest)
+                        needs_write = digest in self.pending
+                        self.refcounts[digest] = self.refcounts.get(digest, 0) + 1
+                    chunks.append(digest)
+                    sizes.append(len(data))
+                    if needs_write:
+                        self.write_chunk(digest, data)
+                        with self.lock:
+                            self.pending.discard(digest)
+        except Exception:
+            with self.lock:
+                self.release(chunks, sizes)
+            raise
+        size = sum(sizes)
+        with self.lock:
+            self.files[name] = {'size': size, 'mtime': os.path.getmtime(source_path), 'chunks': chunks}
+            if save:
+                self.save()
+
+    def remove(self, name, save=True):
+        """Drop name from the manifest; chunks nobody references go once it is saved"""
+        with self.lock:
+            entry = self.files.pop(name)
+            self.release(entry['chunks'], self.chunk_sizes(entry))
+            if save:
+                self.save()
+
+
+class ConfigStore:
+    """Settings kept as an append-only log of changes with periodic compaction.
+
+    The first line of the file is a versioned snapshot of every setting and
+    each following line holds only the settings that changed, written with a
+    single fsynced append. A line torn by a crash is ignored on load. Once the
+    log is long enough it is compacted: the snapshot is written to a temporary
+    file and renamed over the log, so the file is never half-written.
+    """
+
+    FORMAT = "sfm-config"
+    VERSION = 1
+    COMPACT_LINES = 64
+
+    def __init__(self, path, on_rewrite=None):
+        self.path = path
+        self.on_rewrite = on_rewrite
+        self.values = {}
+        self.lines = 0
+
+    def load(self):
+        """Read the settings with one small read, repairing or upgrading the file if needed"""
+        self.values = {}
+        self.lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return self.values
+
+        try:
+            legacy = json.loads(text)
+        except ValueError:
+            legacy = None
+        if isinstance(legacy, dict) and legacy.get('format') != self.FORMAT:
+            # A plain JSON file written by earlier versions
+            self.values = legacy
+            self.compact()
+            return self.values
+
+        torn = False
+        for line in text.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                torn = True
+                break
+            if self.lines == 0:
+                if record.get('format') != self.FORMAT or record.get('version', 0) > self.VERSION:
+                    raise ValueError(f"Unsupported settings file: {self.path}")
+                self.values = record.get('values', {})
+            else:
+                self.values.update(record)
+            self.lines += 1
+        if self.lines == 0 and text.strip():
+            raise ValueError(f"Unreadable settings file: {self.path}")
+        if torn:
+            # Drop the partial line so later appends start on a clean line
+            self.compact()
+        return self.values
+
+    def update(self, changes):
+        """Append the settings that differ from the stored ones"""
+        delta = {key: value for key, value in changes.items()
+                 if key not in self.values or self.values[key] != value}
+        if not delta:
+            return
+        self.values.update(delta)
+        if self.lines == 0 or self.lines >= self.COMPACT_LINES:
+            self.compact()
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(delta, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.lines += 1
+
+    def compact(self):
+        """Rewrite the log as a single snapshot line, atomically"""
+        tmp_path = self.path + ".tmp"
+        snapshot = {'format': self.FORMAT, 'version': self.VERSION, 'values': self.values}
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = 1
+        if self.on_rewrite:
+            self.on_rewrite(self.path)
+
+
+class VaultIndex:
+    """Persistent SQLite index of the files and folders inside a vault.
+
+    Running totals are kept by triggers, so storage statistics are a single
+    row read. The index is updated directly when the application adds or
+    removes entries and reconciled lazily: only directories whose mtime
+    changed since they were last scanned are listed again.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS entries (
+            path TEXT PRIMARY KEY, parent TEXT NOT NULL,
+            is_dir INTEGER NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS entries_parent ON entries (parent);
+        CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            files INTEGER NOT NULL, folders INTEGER NOT NULL, bytes INTEGER NOT NULL);
+        INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+            UPDATE totals SET files = files + 1 - NEW.is_dir, folders = folders + NEW.is_dir,
+                              bytes = bytes + NEW.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+            UPDATE totals SET files = files - 1 + OLD.is_dir, folders = folders - OLD.is_dir,
+                              bytes = bytes - OLD.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+            UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 1;
+        END;
+    """
+
+    def __init__(self, db_path, root, skip_names=()):
+        self.root = root
+        self.skip_names = set(skip_names)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.conn:
+            self.conn.executescript(self.SCHEMA)
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+            if not row or row[0] != root:
+                # Index belongs to another vault: start over and scan lazily
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("DELETE FROM dirs")
+                self.conn.execute("UPDATE totals SET files = 0, folders = 0, bytes = 0")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (root,))
+                self.conn.execute("INSERT INTO dirs VALUES ('', NULL)")
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+    def abspath(self, rel_path):
+        """Absolute location of an indexed path"""
+        return os.path.join(self.root, rel_path) if rel_path else self.root
+
+    def _delete_tree(self, rel_path):
+        """Remove an entry and everything indexed below it"""
+        low = rel_path + os.sep
+        high = rel_path + chr(ord(os.sep) + 1)
+        for table in ("entries", "dirs"):
+            self.conn.execute(f"DELETE FROM {table} WHERE path = ? OR (path >= ? AND path < ?)",
+                              (rel_path, low, high))
+
+    def _touch_dir(self, parent):
+        """Record a folder's new mtime after the application changed it itself"""
+        try:
+            mtime = os.stat(self.abspath(parent)).st_mtime
+        except OSError:
+            return
+        self.conn.execute("UPDATE dirs SET mtime = ? WHERE path = ? AND mtime IS NOT NULL",
+                          (mtime, parent))
+
+    def _upsert(self, rel_path, is_dir, size, mtime):
+        parent = os.path.dirname(rel_path)
+        row = self.conn.execute("SELECT is_dir FROM entries WHERE path = ?", (rel_path,)).fetchone()
+        if row and row[0] != is_dir:
+            self._delete_tree(rel_path)
+            row = None
+        if row:
+            self.conn.execute("UPDATE entries SET size = ?, mtime = ? WHERE path = ?",
+                              (size, mtime, rel_path))
+        else:
+            self.conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                              (rel_path, parent, is_dir, size, mtime))
+        if is_dir:
+            self.conn.execute("INSERT OR IGNORE INTO dirs VALUES (?, NULL)", (rel_path,))
+
+    def record_files(self, rel_paths):
+        """Index files the application just wrote"""
+        with self.lock, self.conn:
+            parents = set()
+            for rel_path in rel_paths:
+                st = os.stat(self.abspath(rel_path))
+                self._upsert(rel_path, 0, st.st_size, st.st_mtime)
+                parents.add(os.path.dirname(rel_path))
+            # One stat per folder, however many files were written into it
+            for parent in parents:
+                self._touch_dir(parent)
+
+    def record_dirs(self, rel_paths):
+        """Index folders the application just created, with their contents already recorded"""
+        with self.lock, self.conn:
+            mtimes = {rel_path: os.stat(self.abspath(rel_path)).st_mtime for rel_path in rel_paths}
+            for rel_path, mtime in mtimes.items():
+                if rel_path:
+                    self._upsert(rel_path, 1, 0, mtime)
+            for rel_path, mtime in mtimes.items():
+                self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (rel_path, mtime))
+
+    def remove(self, rel_paths):
+        """Drop deleted files and folders from the index in one transaction"""
+        with self.lock, self.conn:
+            for rel_path in rel_paths:
+                self._delete_tree(rel_path)
+            # One stat per affected folder, however many entries left it
+            for parent in {os.path.dirname(rel_path) for rel_path in rel_paths}:
+                self._touch_dir(parent)
+
+    def _rescan(self, rel_dir):
+        """List one directory and apply the differences; returns new subfolders"""
+        existing = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT path, is_dir, size, mtime FROM entries WHERE parent = ?", (rel_dir,))}
+        new_dirs = []
+        with os.scandir(self.abspath(rel_dir)) as it:
+            for entry in it:
+                if not rel_dir and entry.name in self.skip_names:
+                    continue
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    is_dir = 1 if entry.is_dir(follow_symlinks=False) else 0
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                size = 0 if is_dir else st.st_size
+                if existing.pop(rel_path, None) != (is_dir, size, st.st_mtime):
+                    self._upsert(rel_path, is_dir, size, st.st_mtime)
+                    if is_dir:
+                        new_dirs.append(rel_path)
+        for rel_path in existing:
+            self._delete_tree(rel_path)
+        return new_dirs
+
+    def reconcile(self, rel_dir=None):
+        """Bring the index up to date, rescanning only directories that changed.
+
+        With rel_dir, only that directory's own listing is checked.
+        """
+        with self.lock, self.conn:
+            if rel_dir is None:
+                pending = [row[0] for row in self.conn.execute("SELECT path FROM dirs")]
+                recursive = True
+            else:
+                pending = [rel_dir]
+                recursive = False
+            while pending:
+                path = pending.pop()
+                try:
+                    mtime = os.stat(self.abspath(path)).st_mtime
+                except FileNotFoundError:
+                    if path:
+                        self._delete_tree(path)
+                    continue
+                row = self.conn.execute("SELECT mtime FROM dirs WHERE path = ?", (path,)).fetchone()
+                if row and row[0] == mtime:
+                    continue
+                new_dirs = self._rescan(path)
+                self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (path, mtime))
+                if recursive:
+                    pending.extend(new_dirs)
+
+    def stats(self):
+        """Return (files, folders, total bytes) without touching the disk"""
+        with self.lock:
+            return self.conn.execute("SELECT files, folders, bytes FROM totals").fetchone()
+
+    def list_dir(self, rel_dir=""):
+        """Return (name, is_dir, size, mtime) for the entries of a directory"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, is_dir, size, mtime FROM entries WHERE parent = ?", (rel_dir,)).fetchall()
+        return [(os.path.basename(path), is_dir, size, mtime) for path, is_dir, size, mtime in rows]
+
+
+class VaultTrash:
+    """Instant deletes: entries are renamed into ``.trash`` and reclaimed later.
+
+    The rename is atomic and O(1) whatever the size of a folder, so the caller
+    can update the index and the file list right away. A single background
+    thread with the lowest CPU and I/O priority (background mode on Windows)
+    then removes the trashed entries, optionally overwriting file contents first.
+    Entries left over by a previous session are reclaimed on startup.
+    """
+
+    TRASH_DIR = ".trash"
+    THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+    OVERWRITE_CHUNK = 1024 * 1024
+    YIELD_EVERY = 64
+
+    def __init__(self, root, secure_overwrite=False):
+        self.root = root
+        self.trash_dir = os.path.join(root, self.TRASH_DIR)
+        self.secure_overwrite = secure_overwrite
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        # next() on a count is atomic, so discards from several threads get distinct names
+        self.counter = itertools.count(1)
+        self.reclaimed = 0
+        if os.path.isdir(self.trash_dir):
+            for name in os.listdir(self.trash_dir):
+                self.pending.put(os.path.join(self.trash_dir, name))
+            if not self.pending.empty():
+                self.start()
+
+    def discard(self, rel_path):
+        """Move rel_path out of the vault's visible tree and queue it for reclamation"""
+        os.makedirs(self.trash_dir, exist_ok=True)
+        trash_path = os.path.join(self.trash_dir, f"{time.time_ns()}-{next(self.counter)}")
+        os.rename(os.path.join(self.root, rel_path), trash_path)
+        self.pending.put(trash_path)
+        self.start()
+        return trash_path
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        """Reclaim trashed entries one at a time; runs on the background thread"""
+        if platform.system() == "Windows":
+            import ctypes
+            # Lowers this thread's CPU, I/O and memory priority until it exits
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), self.THREAD_MODE_BACKGROUND_BEGIN)
+        elif hasattr(os, "setpriority"):
+            try:
+                # On Linux the niceness applies to this thread only, and the I/O
+                # scheduler derives the thread's I/O priority from it
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except OSError:
+                pass
+        while True:
+            try:
+                trash_path = self.pending.get(timeout=1)
+            except queue.Empty:
+                with self.lock:
+                    if self.pending.empty():
+                        self.thread = None
+                        return
+                continue
+            try:
+                self.reclaim(trash_path)
+            except OSError as e:
+                print(f"Could not reclaim {trash_path}: {e}")
+
+    def wipe(self, path):
+        """Overwrite a file's contents in place before it is unlinked"""
+        with open(path, 'r+b') as f:
+            remaining = os.fstat(f.fileno()).st_size
+            while remaining > 0:
+                data = os.urandom(min(self.OVERWRITE_CHUNK, remaining))
+                f.write(data)
+                remaining -= len(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove_file(self, path):
+        if self.secure_overwrite and not os.path.islink(path):
+            self.wipe(path)
+        os.remove(path)
+        self.reclaimed += 1
+        if self.reclaimed % self.YIELD_EVERY == 0:
+            # Leave the disk to the foreground between bursts of unlinks
+            time.sleep(0.01)
+
+    def reclaim(self, trash_path):
+        """Delete one trashed file or folder tree, deepest entries first"""
+        if not os.path.isdir(trash_path) or os.path.islink(trash_path):
+            self.remove_file(trash_path)
+            return
+        stack = [(trash_path, False)]
+        while stack:
+            path, listed = stack.pop()
+            if listed:
+                os.rmdir(path)
+                continue
+            stack.append((path, True))
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, False))
+                    else:
+                        self.remove_file(entry.path)
+
+
+class ChunkedCipher:
+    """Streaming AES-256-GCM encryption of vault files in fixed-size chunks.
+
+    File layout: a header (magic, chunk size, plaintext size, 8-byte random
+    nonce prefix) followed by one sealed chunk per ``chunk_size`` bytes of
+    plaintext. Chunk ``i`` uses the nonce prefix + ``i`` and is bound to its
+    position and to whether it is the last chunk, so chunks cannot be
+    reordered or the file truncated unnoticed. Since every chunk has the same
+    sealed size, any chunk can be located and decrypted on its own.
+
+    Chunks are sealed on a worker pool with a bounded number in flight, so
+    memory use does not depend on the file size.
+    """
+
+    MAGIC = b"SFMENC01"
+    HEADER = struct.Struct(">8sIQ8s")
+    TAG_SIZE = 16
+    CHUNK_SIZE = 1024 * 1024
+    SUFFIX = ".sfmenc"
+
+    def __init__(self, key, workers=None, chunk_size=None):
+        self.aead = AESGCM(key)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def get_pool(self):
+        """Worker pool shared by all files handled by this cipher"""
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers)
+            return self.pool
+
+    def close(self):
+        """Stop the worker pool"""
+        with self.pool_lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+    @staticmethod
+    def chunk_count(size, chunk_size):
+        """Number of sealed chunks for size bytes; empty files still get one"""
+        return max(1, -(-size // chunk_size))
+
+    def aad(self, chunk_size, index, last):
+        return self.MAGIC + struct.pack(">IQ?", chunk_size, index, last)
+
+    @staticmethod
+    def nonce(prefix, index):
+        return prefix + struct.pack(">I", index)
+
+    def read_header(self, f):
+        """Return (chunk_size, plaintext size, nonce prefix) of an open encrypted file"""
+        f.seek(0)
+        magic, chunk_size, size, prefix = self.HEADER.unpack(f.read(self.HEADER.size))
+        if magic != self.MAGIC:
+            raise ValueError("not an encrypted vault file")
+        return chunk_size, size, prefix
+
+    def run_ordered(self, jobs, sink):
+        """Run (function, args) jobs on the pool and feed results to sink in order"""
+        pending = deque()
+        window = 2 * self.workers
+        pool = self.get_pool() if self.workers > 1 else None
+        for func, args in jobs:
+            if pool is None:
+                sink(func(*args))
+                continue
+            pending.append(pool.submit(func, *args))
+            if len(pending) >= window:
+                sink(pending.popleft().result())
+        while pending:
+            sink(pending.popleft().result())
+
+    def encrypt_file(self, source_path, dest_path):
+        """Encrypt source_path into dest_path"""
+        chunk_size = self.chunk_size
+        prefix = os.urandom(8)
+        with open(source_path, 'rb') as fsrc, open(dest_path, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            count = self.chunk_count(size, chunk_size)
+            fdst.write(self.HEADER.pack(self.MAGIC, chunk_size, size, prefix))
+
+            def jobs():
+                for index in range(count):
+                    data = fsrc.read(chunk_size)
+                    expected = min(chunk_size, size - index * chunk_size)
+                    if len(data) != expected:
+                        raise IOError("file changed while it was being encrypted")
+                    yield self.aead.encrypt, (self.nonce(prefix, index), data,
+                                              self.aad(chunk_size, index, index == count - 1))
+
+            self.run_ordered(jobs(), fdst.write)
+        shutil.copystat(source_path, dest_path)
+
+    def decrypt_chunk(self, f, index, header=None):
+        """Decrypt chunk number index of an open encrypted file"""
+        chunk_size, size, prefix = header or self.read_header(f)
+        count = self.chunk_count(size, chunk_size)
+        if not 0 <= index < count:
+            raise IndexError("chunk out of range")
+        plain_len = min(chunk_size, size - index * chunk_size)
+        f.seek(self.HEADER.size + index * (chunk_size + self.TAG_SIZE))
+        sealed = f.read(plain_len + self.TAG_SIZE)
+        return self.aead.decrypt(self.nonce(prefix, index), sealed,
+                                 self.aad(chunk_size, index, index == count - 1))
+
+    def decrypt_file(self, source_path, dest_path):
+        """Decrypt a whole file, streaming chunk by chunk"""
+        with open(source_path, 'rb') as fsrc, open(dest_path, 'wb') as fdst:
+            chunk_size, size, prefix = self.read_header(fsrc)
+            count = self.chunk_count(size, chunk_size)
+
+            def jobs():
+                for index in range(count):
+                    plain_len = min(chunk_size, size - index * chunk_size)
+                    sealed = fsrc.read(plain_len + self.TAG_SIZE)
+                    yield self.aead.decrypt, (self.nonce(prefix, index), sealed,
+                                              self.aad(chunk_size, index, index == count - 1))
+
+            self.run_ordered(jobs(), fdst.write)
+        shutil.copystat(source_path, dest_path)
+
+
+# Target time for one password derivation, and cost floors that hold even on slow machines
+KDF_TARGET_MS = 250
+KDF_MIN_SCRYPT_N = 2 ** 14
+KDF_MAX_SCRYPT_N = 2 ** 20
+KDF_MIN_PBKDF2_ITERATIONS = 200000
+
+
+def derive_key(password, params, dklen=32):
+    """Derive a key from password using the KDF described by params.
+
+    params holds the algorithm name, a hex salt and its cost settings:
+    ``scrypt`` uses n/r/p, ``pbkdf2`` uses iterations (HMAC-SHA256).
+    """
+    salt = bytes.fromhex(params['salt'])
+    algorithm = params.get('algorithm', 'scrypt')
+    if algorithm == 'scrypt':
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=2 * 128 * n * r * p, dklen=dklen)
+    if algorithm == 'pbkdf2':
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, params['iterations'], dklen)
+    raise ValueError(f"Unknown key derivation function: {algorithm}")
+
+
+def calibrate_kdf(algorithm='scrypt', target_ms=KDF_TARGET_MS):
+    """Pick KDF parameters that take about target_ms on this machine, with a fresh salt"""
+    params = {'algorithm': algorithm, 'salt': os.urandom(16).hex()}
+
+    def measure(trial):
+        start = time.perf_counter()
+        derive_key("calibration", trial)
+        return (time.perf_counter() - start) * 1000
+
+    if algorithm == 'scrypt':
+        # Cost doubles with n: stop at the largest n that stays under the target
+        params.update(r=8, p=1, n=KDF_MIN_SCRYPT_N)
+        while params['n'] < KDF_MAX_SCRYPT_N and measure(params) * 2 <= target_ms:
+            params['n'] *= 2
+    elif algorithm == 'pbkdf2':
+        # Cost is linear in iterations: scale one measurement
+        probe = dict(params, iterations=50000)
+        elapsed = measure(probe)
+        params['iterations'] = max(KDF_MIN_PBKDF2_ITERATIONS, int(50000 * target_ms / max(elapsed, 0.001)))
+    else:
+        raise ValueError(f"Unknown key derivation function: {algorithm}")
+    return params
+
+
+def wrap_data_key(data_key, wrapping_key):
+    """Seal the data key with a password-derived key, for storing in the config"""
+    nonce = os.urandom(12)
+    sealed = AESGCM(wrapping_key).encrypt(nonce, data_key, b"data-key")
+    return {'nonce': nonce.hex(), 'wrapped': sealed.hex()}
+
+
+def unwrap_data_key(wrap, wrapping_key):
+    """Recover the data key sealed by wrap_data_key"""
+    return AESGCM(wrapping_key).decrypt(
+        bytes.fromhex(wrap['nonce']), bytes.fromhex(wrap['wrapped']), b"data-key")
+
+
+def benchmark_kdf(target_ms=KDF_TARGET_MS):
+    """Calibrate each KDF for this machine and report the resulting unlock time"""
+    for algorithm in ('scrypt', 'pbkdf2'):
+        start = time.perf_counter()
+        params = calibrate_kdf(algorithm, target_ms)
+        calibration_time = time.perf_counter() - start
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            derive_key("benchmark", params)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        cost = {k: v for k, v in params.items() if k not in ('algorithm', 'salt')}
+        print(f"{algorithm:<7} {cost}: unlock {timings[2]:.0f} ms median "
+              f"({timings[0]:.0f}-{timings[-1]:.0f} ms), calibration took {calibration_time:.1f} s")
+
+
+class ChunkCache:
+    """Thread-safe LRU cache of decrypted or reassembled chunks, bounded in bytes"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.chunks = OrderedDict()
+        self.size = 0
+
+    def get(self, key, load):
+        """Return the cached chunk for key, calling load() on a miss"""
+        with self.lock:
+            if key in self.chunks:
+                self.chunks.move_to_end(key)
+                return self.chunks[key]
+        data = load()
+        with self.lock:
+            if key not in self.chunks:
+                self.chunks[key] = data
+                self.size += len(data)
+                while self.size > self.max_bytes and len(self.chunks) > 1:
+                    _, evicted = self.chunks.popitem(last=False)
+                    self.size -= len(evicted)
+        return data
+
+    def clear(self):
+        with self.lock:
+            self.chunks.clear()
+            self.size = 0
+
+
+class EncryptedFileReader:
+    """Random-access reads of an encrypted vault file, one chunk at a time"""
+
+    def __init__(self, path, cipher, cache):
+        self.path = path
+        self.cipher = cipher
+        self.cache = cache
+        with open(path, 'rb') as f:
+            self.header = cipher.read_header(f)
+        self.chunk_size, self.size, _ = self.header
+        st = os.stat(path)
+        self.stamp = (path, st.st_mtime_ns, st.st_size)
+
+    def iter_range(self, start, stop):
+        """Yield the plaintext bytes from start up to stop"""
+        with open(self.path, 'rb') as f:
+            while start < stop:
+                index = start // self.chunk_size
+                data = self.cache.get(self.stamp + (index,),
+                                      lambda: self.cipher.decrypt_chunk(f, index, self.header))
+                piece = data[start - index * self.chunk_size:stop - index * self.chunk_size]
+                yield piece
+                start += len(piece)
+
+
+class BlockFileReader:
+    """Random-access reads of a file kept in the deduplicating block store"""
+
+    def __init__(self, store, name, cache):
+        self.store = store
+        self.cache = cache
+        entry = store.files[name]
+        self.chunks = list(entry['chunks'])
+        self.size = entry['size']
+        self.chunk_size = store.CHUNK_SIZE
+
+    def load_chunk(self, digest):
+        with open(self.store.chunk_path(digest), 'rb') as f:
+            return f.read()
+
+    def iter_range(self, start, stop):
+        """Yield the file's bytes from start up to stop"""
+        while start < stop:
+            index = start // self.chunk_size
+            digest = self.chunks[index]
+            data = self.cache.get(digest, lambda: self.load_chunk(digest))
+            piece = data[start - index * self.chunk_size:stop - index * self.chunk_size]
+            yield piece
+            start += len(piece)
+
+
+def parse_byte_range(header, size):
+    """Parse a single HTTP byte range into (start, stop); None if unsatisfiable.
+
+    Invalid headers (RFC 7233 says to ignore them) and ones this server does
+    not handle (several ranges) give (0, size), so the whole file is sent.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return 0, size
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return 0, size
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(0, size - length), size
+    start = int(first)
+    if last and int(last) < start:
+        return 0, size
+    if start >= size:
+        return None
+    stop = int(last) + 1 if last else size
+    return start, min(stop, size)
+
+
+class VaultRequestHandler(BaseHTTPRequestHandler):
+    """Serve published vault files with HTTP range support"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def serve(self, send_body):
+        published = self.server.vault.lookup(self.path)
+        if published is None:
+            self.send_error(404)
+            return
+        reader, filename = published
+
+        status = 200
+        start, stop = 0, reader.size
+        if self.headers.get("Range"):
+            byte_range = parse_byte_range(self.headers["Range"], reader.size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{reader.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, stop = byte_range
+            if (start, stop) != (0, reader.size):
+                status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(stop - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Cache-Control", "no-store")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{stop - 1}/{reader.size}")
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            for piece in reader.iter_range(start, stop):
+                self.wfile.write(piece)
+        except (BrokenPipeError, ConnectionResetError):
+            # Viewers routinely drop a connection once they have the bytes they need
+            pass
+
+
+class VaultStreamServer:
+    """Local read-only view of vault files over HTTP on the loopback interface.
+
+    Encrypted and deduplicated files are decrypted or reassembled only for the
+    byte ranges a viewer requests, with recently used chunks kept in an LRU
+    cache, so no plaintext copy is written to disk. URLs carry an unguessable
+    token and stop working when the server is closed on lock. Only the most
+    recently used MAX_PUBLISHED links are kept; older ones stop working.
+    """
+
+    MAX_PUBLISHED = 32
+
+    def __init__(self, cache_bytes=64 * 1024 * 1024):
+        self.token = secrets.token_urlsafe(24)
+        self.readers = OrderedDict()
+        self.readers_lock = threading.Lock()
+        self.cache = ChunkCache(cache_bytes)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), VaultRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.vault = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def publish(self, reader, filename):
+        """Make a reader available and return its URL"""
+        file_id = secrets.token_urlsafe(8)
+        with self.readers_lock:
+            self.readers[file_id] = (reader, filename)
+            while len(self.readers) > self.MAX_PUBLISHED:
+                self.readers.popitem(last=False)
+        port = self.httpd.server_address[1]
+        return f"http://127.0.0.1:{port}/{self.token}/{file_id}/{urllib.parse.quote(filename)}"
+
+    def lookup(self, path):
+        """Find the reader for a request path, checking the token"""
+        parts = urllib.parse.urlsplit(path).path.split("/")
+        if len(parts) < 3 or not hmac.compare_digest(parts[1], self.token):
+            return None
+        with self.readers_lock:
+            published = self.readers.get(parts[2])
+            if published is not None:
+                self.readers.move_to_end(parts[2])
+        return published
+
+    def close(self):
+        """Stop serving and drop all cached plaintext"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        with self.readers_lock:
+            self.readers.clear()
+        self.cache.clear()
+
+
+class VirtualTreeList:
+    """Show a long list in a ttk.Treeview while creating only the visible rows.
+
+    A small pool of Treeview items is reused as the list scrolls: each item
+    is rewritten only when the row it shows changes, so scrolling and
+    refreshing cost O(visible rows) Tk calls no matter how long the list is.
+    Rows are tuples whose first element is a unique key.
+    """
+
+    def __init__(self, tree, scrollbar, format_row):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.rows = []
+        self.offset = 0
+        self.slots = []
+        self.slot_rows = {}
+        self.selected_keys = set()
+
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", lambda e: self.render())
+        tree.bind("<<TreeviewSelect>>", self.on_select)
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<Up>", lambda e: self.move_focus(-1))
+        tree.bind("<Down>", lambda e: self.move_focus(1))
+        tree.bind("<Prior>", lambda e: self.scroll(-self.visible_count()))
+        tree.bind("<Next>", lambda e: self.scroll(self.visible_count()))
+
+    def visible_count(self):
+        """Number of rows that fit in the widget, below the heading"""
+        rowheight = ttk.Style().lookup("Treeview", "rowheight")
+        rowheight = int(rowheight) if rowheight else 20
+        return max(1, self.tree.winfo_height() // rowheight - 1)
+
+    def set_rows(self, rows):
+        """Replace the list contents; visible items are rewritten only where rows changed"""
+        self.rows = rows
+        self.render()
+
+    def render(self):
+        """Point the item pool at the rows currently scrolled into view"""
+        count = min(self.visible_count(), len(self.rows))
+        self.offset = max(0, min(self.offset, len(self.rows) - count))
+
+        while len(self.slots) < count:
+            self.slots.append(self.tree.insert("", "end", text=""))
+        while len(self.slots) > count:
+            item = self.slots.pop()
+            self.slot_rows.pop(item, None)
+            self.tree.delete(item)
+
+        selection = []
+        for i, item in enumerate(self.slots):
+            row = self.rows[self.offset + i]
+            if self.slot_rows.get(item) != row:
+                text, values, tags = self.format_row(row)
+                self.tree.item(item, text=text, values=values, tags=tags)
+                self.slot_rows[item] = row
+            if row[0] in self.selected_keys:
+                selection.append(item)
+        if set(selection) != set(self.tree.selection()):
+            self.tree.selection_set(selection)
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, delta):
+        """Scroll by delta rows"""
+        self.offset += delta
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar callback"""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible_count() if args[2] == "pages" else 1
+            self.offset += int(args[1]) * step
+        self.render()
+
+    def move_focus(self, delta):
+        """Arrow keys: scroll the list when the focus leaves the visible rows"""
+        focus = self.tree.focus()
+        if focus not in self.slots:
+            return None
+        position = self.offset + self.slots.index(focus) + delta
+        if not 0 <= position < len(self.rows):
+            return "break"
+        self.selected_keys = {self.rows[position][0]}
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + len(self.slots):
+            self.offset = position - len(self.slots) + 1
+        self.render()
+        self.tree.focus(self.slots[position - self.offset])
+        return "break"
+
+    def on_select(self, event=None):
+        """Keep the selection by key so it survives scrolling"""
+        visible = {self.slot_rows[item][0] for item in self.slots if item in self.slot_rows}
+        chosen = {self.slot_rows[item][0] for item in self.tree.selection() if item in self.slot_rows}
+        self.selected_keys = (self.selected_keys - visible) | chosen
+
+    def selected_rows(self):
+        """Rows selected anywhere in the list, including scrolled-out ones"""
+        return [row for row in self.rows if row[0] in self.selected_keys]
+
+    def remove_rows(self, keys):
+        """Drop rows by key without rebuilding the list"""
+        self.rows = [row for row in self.rows if row[0] not in keys]
+        self.selected_keys -= keys
+        self.render()
+
+
+def parse_size(text):
+    """Parse sizes such as 1M, 256M or 10G"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def benchmark_encryption(sizes=("1M", "16M", "256M"), work_dir=None):
+    """Measure ChunkedCipher throughput for several file sizes and worker counts"""
+    if AESGCM is None:
+        print("The cryptography package is required: pip install cryptography")
+        return
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    key = AESGCM.generate_key(bit_length=256)
+    worker_counts = sorted({1, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory(dir=work_dir) as work:
+        for size_text in sizes:
+            size = parse_size(size_text)
+            source = os.path.join(work, "plain.bin")
+            block = os.urandom(COPY_CHUNK_SIZE)
+            with open(source, 'wb') as f:
+                remaining = size
+                while remaining > 0:
+                    f.write(block[:remaining])
+                    remaining -= len(block)
+            for workers in worker_counts:
+                cipher = ChunkedCipher(key, workers=workers)
+                start = time.perf_counter()
+                cipher.encrypt_file(source, os.path.join(work, "sealed.bin"))
+                encrypt_time = time.perf_counter() - start
+                start = time.perf_counter()
+                cipher.decrypt_file(os.path.join(work, "sealed.bin"), os.path.join(work, "opened.bin"))
+                decrypt_time = time.perf_counter() - start
+                cipher.close()
+                mb = size / (1024 * 1024)
+                line = (f"{size_text:>6} {workers:>2} workers: encrypt {mb / encrypt_time:8.1f} MB/s, "
+                        f"decrypt {mb / decrypt_time:8.1f} MB/s")
+                if resource is not None:
+                    line += f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} MB"
+                print(line)
+            for name in ("plain.bin", "sealed.bin", "opened.bin"):
+                os.remove(os.path.join(work, name))
+
+
+def benchmark_migration(file_count=20000, file_size=4096):
+    """Compare the old serial copy loop with MigrationEngine on synthetic small files"""
+    with tempfile.TemporaryDirectory() as work:
+        source = os.path.join(work, "gen1")
+        payload = os.urandom(file_size)
+        for i in range(file_count):
+            folder = os.path.join(source, f"dir{i % 100:03d}")
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"file{i}.bin"), 'wb') as f:
+                f.write(payload)
+
+        # Serial loop as previously used by migrate_from_gen1 (two walks, copy2 per file)
+        serial_dest = os.path.join(work, "serial")
+        start = time.perf_counter()
+        sum(len(files) for _, _, files in os.walk(source))
+        for root, dirs, files in os.walk(source):
+            for file in files:
+                source_file = os.path.join(root, file)
+                dest_file = os.path.join(serial_dest, os.path.relpath(source_file, source))
+                os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+                shutil.copy2(source_file, dest_file)
+        serial_time = time.perf_counter() - start
+
+        results = [("serial copy2 loop", serial_time)]
+        for verify in (False, True):
+            dest = os.path.join(work, f"engine_{verify}")
+            engine = MigrationEngine(source, dest, os.path.join(work, f"journal_{verify}"),
+                                     verify=verify)
+            start = time.perf_counter()
+            engine.run()
+            results.append((f"engine ({engine.workers} workers, verify={verify})",
+                            time.perf_counter() - start))
+
+        print(f"Migrating {file_count} files of {file_size} bytes:")
+        for label, elapsed in results:
+            print(f"  {label:<40} {elapsed:8.2f} s  {file_count / elapsed:10.0f} files/s")
+
+
 class SecureFolderManager:
+    # Bookkeeping entries inside the secure folder that are not user files
+    reserved_names = {BlockStore.BLOCKS_DIR, BlockStore.MANIFEST, BlockStore.MANIFEST + ".tmp",
+                      VaultTrash.TRASH_DIR}
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Secure Folder Manager Gen 2")
@@ -69,16 +1638,44 @@ class SecureFolderManager:
         # Configuration paths (safer locations)
         self.config_dir = self.get_safe_config_directory()
         self.config_file = os.path.join(self.config_dir, ".config_gen2.json")
+        self.config_store = ConfigStore(self.config_file, on_rewrite=self.hide_path)
         
         # Legacy Gen 1 config for migration
         self.legacy_config_dir = os.path.join(os.path.expanduser("~"), ".secure_folder_config")
         self.legacy_config_file = os.path.join(self.legacy_config_dir, ".config.json")
+        self.migration_journal = os.path.join(self.config_dir, ".migration_journal")
+        self.index_file = os.path.join(self.config_dir, ".vault_index.db")
         
         # Secure folder path (will be set dynamically in safer location)
         self.secure_folder = None
         self.is_unlocked = False
         self.password_hash = None
         
+        # Storage mode for newly added files: "plain" copies, "dedup" block store or "encrypted"
+        self.storage_mode = "plain"
+        self.storage_modes = {"Plain copies": "plain", "Deduplicated": "dedup", "Encrypted": "encrypted"}
+        
+        # Encryption at rest: a random data key, sealed in the config with a password-derived key
+        self.key_wrap = None
+        self.data_key = None
+        self.wrapping_key = None
+        self.cipher = None
+        
+        # Password key derivation settings (salt and cost); None for SHA-256 vaults from before
+        self.kdf = None
+        self.block_store = None
+        self.name_index = None
+        self.vault_index = None
+        self.stream_server = None
+        self.ingest = None
+        
+        # Deleted entries wait in the vault's trash until a background thread reclaims them
+        self.trash = None
+        self.secure_delete = False
+        
+        # Folder being browsed, relative to the secure folder
+        self.current_dir = ""
+        
         # Create config directory if it doesn't exist
         os.makedirs(self.config_dir, exist_ok=True)
         self.hide_path(self.config_dir)
@@ -92,9 +1689,12 @@ class SecureFolderManager:
         # Load configuration
         self.load_config()
         
-        # Check if first run
+        # Check if first run (an interrupted migration resumes on the next launch instead)
         if not self.password_hash:
-            self.first_run_setup()
+            if os.path.exists(self.migration_journal):
+                self.status_var.set("Migration from Gen 1 is incomplete. Restart to resume it.")
+            else:
+                self.first_run_setup()
     
     def get_safe_config_directory(self):
         """Get a safe directory for storing configuration and data"""
@@ -164,71 +1764,89 @@ class SecureFolderManager:
     def migrate_from_gen1(self, legacy_config, legacy_secure_folder, legacy_password_hash):
         """Migrate data from Gen 1 to Gen 2"""
         try:
-            # Create new secure folder in safe location
-            new_secure_folder = self.get_safe_secure_directory()
+            # Resume into the same vault if a previous migration was interrupted
+            journal_path = self.migration_journal
+            header, _ = MigrationEngine.read_journal(journal_path)
+            if header and header.get('source') == legacy_secure_folder and header.get('dest'):
+                new_secure_folder = header['dest']
+            else:
+                # Create new secure folder in safe location
+                new_secure_folder = self.get_safe_secure_directory()
             os.makedirs(new_secure_folder, exist_ok=True)
             self.hide_path(new_secure_folder)
-            
-            # Count files to migrate
-            file_count = 0
-            for root, dirs, files in os.walk(legacy_secure_folder):
-                file_count += len(files)
-            
-            if file_count > 0:
-                # Show progress dialog
-                progress_window = tk.Toplevel(self.root)
-                progress_window.title("Migrating Data...")
-                progress_window.geometry("400x150")
-                progress_window.transient(self.root)
-                progress_window.grab_set()
-                
-                # Center the progress window
-                progress_window.geometry("+%d+%d" % (
-                    self.root.winfo_rootx() + 200,
-                    self.root.winfo_rooty() + 200
-                ))
-                
-                ttk.Label(progress_window, text="Migrating your secure files to safer location...").pack(pady=10)
-                
-                progress_var = tk.DoubleVar()
-                progress_bar = ttk.Progressbar(progress_window, variable=progress_var, maximum=100)
-                progress_bar.pack(pady=10, padx=20, fill='x')
-                
-                status_label = ttk.Label(progress_window, text="Preparing migration...")
-                status_label.pack(pady=5)
-                
-                # Update the progress window
-                progress_window.update()
-                
-                # Copy all files and folders
-                migrated_count = 0
-                for root, dirs, files in os.walk(legacy_secure_folder):
-                    for file in files:
-                        source_file = os.path.join(root, file)
-                        # Maintain directory structure
-                        rel_path = os.path.relpath(source_file, legacy_secure_folder)
-                        dest_file = os.path.join(new_secure_folder, rel_path)
-                        
-                        # Create destination directory if needed
-                        dest_dir = os.path.dirname(dest_file)
-                        os.makedirs(dest_dir, exist_ok=True)
-                        
-                        # Copy file
-                        shutil.copy2(source_file, dest_file)
-                        migrated_count += 1
-                        
-                        # Update progress
-                        progress = (migrated_count / file_count) * 100
-                        progress_var.set(progress)
-                        status_label.config(text=f"Migrated {migrated_count}/{file_count} files...")
-                        progress_window.update()
-                
-                progress_window.destroy()
-            
-            # Update configuration
+
+            self.vault_index = VaultIndex(self.index_file, new_secure_folder, self.reserved_names)
+            engine = MigrationEngine(legacy_secure_folder, new_secure_folder, journal_path,
+                                     index=self.vault_index)
+
+            # Show progress dialog
+            progress_window = tk.Toplevel(self.root)
+            progress_window.title("Migrating Data...")
+            progress_window.geometry("400x150")
+            progress_window.transient(self.root)
+            progress_window.grab_set()
+
+            # Center the progress window
+            progress_window.geometry("+%d+%d" % (
+                self.root.winfo_rootx() + 200,
+                self.root.winfo_rooty() + 200
+            ))
+
+            ttk.Label(progress_window, text="Migrating your secure files to safer location...").pack(pady=10)
+
+            progress_var = tk.DoubleVar()
+            progress_bar = ttk.Progressbar(progress_window, variable=progress_var, maximum=100)
+            progress_bar.pack(pady=10, padx=20, fill='x')
+
+            status_label = ttk.Label(progress_window, text="Preparing migration...")
+            status_label.pack(pady=5)
+
+            outcome = {}
+
+            def poll_progress():
+                # Drain everything queued since the last poll and draw only the latest state
+                try:
+                    while True:
+                        kind, value, total = engine.progress_queue.get_nowait()
+                        if kind == 'progress':
+                            progress_var.set((value / total) * 100 if total else 100)
+                            status_label.config(text=f"Migrated {value}/{total} files...")
+                        else:
+                            outcome['kind'] = kind
+                            outcome['value'] = value
+                except queue.Empty:
+                    pass
+                if 'kind' in outcome:
+                    progress_window.destroy()
+                else:
+                    progress_window.after(100, poll_progress)
+
+            # Closing the dialog stops the copy; the journal lets the next run resume
+            progress_window.protocol("WM_DELETE_WINDOW", engine.cancel)
+            engine.start()
+            poll_progress()
+            self.root.wait_window(progress_window)
+
+            if outcome.get('kind') == 'error':
+                raise RuntimeError(outcome['value'])
+            if outcome.get('kind') == 'cancelled' or engine.failures:
+                failed = "\n".join(f"{path}: {error}" for path, error in engine.failures[:10])
+                messagebox.showwarning(
+                    "Migration Incomplete",
+                    f"Migrated {engine.completed}/{engine.total} files.\n"
+                    f"{len(engine.failures)} file(s) failed.\n{failed}\n\n"
+                    f"Your Gen 1 data was left untouched. Restart the application "
+                    f"to resume the migration where it stopped."
+                )
+                return
+
+            file_count = engine.total
+
+            # Update configuration; the journal goes only once the new config is on disk
             self.password_hash = legacy_password_hash
             self.secure_folder = new_secure_folder
             self.save_config()
+            os.remove(journal_path)
             
             # Backup and remove legacy config
             legacy_backup = self.legacy_config_file + ".backup"
@@ -324,9 +1942,12 @@ class SecureFolderManager:
         self.tree.column("Modified", width=200)
         
         # Scrollbars
-        v_scrollbar = ttk.Scrollbar(self.explorer_frame, orient="vertical", command=self.tree.yview)
+        v_scrollbar = ttk.Scrollbar(self.explorer_frame, orient="vertical")
         h_scrollbar = ttk.Scrollbar(self.explorer_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Only the rows in view exist as Treeview items; the list drives the vertical scrollbar
+        self.file_list = VirtualTreeList(self.tree, v_scrollbar, self.format_row)
         
         # Grid layout for tree and scrollbars
         self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -337,23 +1958,37 @@ class SecureFolderManager:
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Open", command=self.open_file)
         self.context_menu.add_command(label="Delete", command=self.delete_file)
+        self.secure_delete_var = tk.BooleanVar(value=False)
+        self.context_menu.add_checkbutton(label="Overwrite Deleted Files", variable=self.secure_delete_var,
+                                          command=lambda: self.set_secure_delete(self.secure_delete_var.get()))
         self.context_menu.add_separator()
         self.context_menu.add_command(label="Add Files", command=self.add_files)
+        self.context_menu.add_command(label="Add Folder", command=self.add_folder)
         self.context_menu.add_command(label="Refresh", command=self.refresh_files)
         
         # Bind right-click
         self.tree.bind("<Button-3>", self.show_context_menu)
         self.tree.bind("<Double-1>", self.open_file)
+        self.tree.bind("<Return>", self.open_file)
         
         # Button frame (removed folder-related buttons and drag-drop info)
         btn_frame = ttk.Frame(main_frame)
         btn_frame.grid(row=3, column=0, columnspan=3, pady=(10, 0))
         
         ttk.Button(btn_frame, text="Add Files", command=self.add_files).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(btn_frame, text="Add Folder", command=self.add_folder).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Refresh", command=self.refresh_files).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Change Password", command=self.change_password).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(btn_frame, text="Show Storage Info", command=self.show_storage_info).pack(side=tk.LEFT, padx=(0, 5))
         
+        ttk.Label(btn_frame, text="Store new files as:").pack(side=tk.LEFT, padx=(5, 5))
+        self.storage_mode_var = tk.StringVar(value="Plain copies")
+        storage_mode_box = ttk.Combobox(btn_frame, textvariable=self.storage_mode_var, state="readonly",
+                                        values=list(self.storage_modes), width=13)
+        storage_mode_box.pack(side=tk.LEFT)
+        storage_mode_box.bind("<<ComboboxSelected>>",
+                              lambda e: self.set_storage_mode(self.storage_modes[self.storage_mode_var.get()]))
+        
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Folder is locked. Please enter password to unlock.")
@@ -367,21 +2002,15 @@ class SecureFolderManager:
             return
         
         try:
-            # Get folder size
-            total_size = 0
-            file_count = 0
-            folder_count = 0
+            # Get folder size from the index, rescanning only folders changed outside the app
+            index = self.get_vault_index()
+            index.reconcile()
+            file_count, folder_count, total_size = index.stats()
             
-            if os.path.exists(self.secure_folder):
-                for root, dirs, files in os.walk(self.secure_folder):
-                    folder_count += len(dirs)
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        try:
-                            total_size += os.path.getsize(file_path)
-                            file_count += 1
-                        except (OSError, IOError):
-                            pass
+            store = self.get_block_store()
+            logical_size = sum(entry['size'] for entry in store.files.values())
+            file_count += len(store.files)
+            total_size += store.stored_bytes
             
             # Format size
             size_str = self.format_size(total_size)
@@ -392,7 +2021,9 @@ class SecureFolderManager:
                 f"Storage Location: {self.config_dir}\n"
                 f"Files: {file_count}\n"
                 f"Folders: {folder_count}\n"
-                f"Total Size: {size_str}\n\n"
+                f"Total Size: {size_str}\n"
+                f"Deduplicated Files: {len(store.files)} "
+                f"({self.format_size(logical_size)} stored as {self.format_size(store.stored_bytes)})\n\n"
                 f"Gen 2 stores your files in a safer location that won't be\n"
                 f"accidentally deleted by system cleanup tools.\n\n"
                 f"Location Details:\n"
@@ -406,37 +2037,72 @@ class SecureFolderManager:
         except Exception as e:
             messagebox.showerror("Error", f"Could not retrieve storage information: {e}")
     
-    def hash_password(self, password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def derive_secrets(self, password, kdf=None):
+        """Return (password verifier, key-wrapping key) for password.
+        
+        One KDF run yields a master key that both are derived from, so unlocking
+        costs a single derivation. Vaults without KDF settings use the original
+        unsalted SHA-256 hash and have no wrapping key.
+        """
+        kdf = self.kdf if kdf is None else kdf
+        if not kdf:
+            return hashlib.sha256(password.encode()).hexdigest(), None
+        master = derive_key(password, kdf)
+        verifier = hmac.new(master, b"password-verifier", hashlib.sha256).hexdigest()
+        wrapping_key = hmac.new(master, b"data-key-wrap", hashlib.sha256).digest()
+        return verifier, wrapping_key
+    
+    def check_password(self, password):
+        """Return (is correct, key-wrapping key) for password"""
+        verifier, wrapping_key = self.derive_secrets(password)
+        return hmac.compare_digest(verifier, self.password_hash or ""), wrapping_key
+    
+    def set_password(self, password):
+        """Store a new password with freshly calibrated KDF settings and salt"""
+        self.status_var.set("Calibrating password protection for this computer...")
+        self.root.update_idletasks()
+        self.kdf = calibrate_kdf()
+        self.password_hash, self.wrapping_key = self.derive_secrets(password)
+        if self.data_key is not None:
+            # Only the sealed data key changes; encrypted files stay as they are
+            self.key_wrap = wrap_data_key(self.data_key, self.wrapping_key)
+        self.save_config()
     
     def load_config(self):
         """Load configuration from file"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.password_hash = config.get('password_hash')
-                    self.secure_folder = config.get('secure_folder')
-                    # Validate secure folder path
-                    if self.secure_folder and not os.path.exists(self.secure_folder):
-                        os.makedirs(self.secure_folder, exist_ok=True)
-                        self.hide_path(self.secure_folder)
+            config = self.config_store.load()
+            if config:
+                self.password_hash = config.get('password_hash')
+                self.secure_folder = config.get('secure_folder')
+                self.storage_mode = config.get('storage_mode', 'plain')
+                self.key_wrap = config.get('key_wrap')
+                self.kdf = config.get('kdf')
+                self.secure_delete = config.get('secure_delete', False)
+                self.secure_delete_var.set(self.secure_delete)
+                self.show_storage_mode()
+                # Validate secure folder path
+                if self.secure_folder and not os.path.exists(self.secure_folder):
+                    os.makedirs(self.secure_folder, exist_ok=True)
+                    self.hide_path(self.secure_folder)
         except Exception as e:
             print(f"Error loading config: {e}")
     
     def save_config(self):
-        """Save configuration to file"""
+        """Save the settings that changed since the last save"""
         try:
             config = {
                 'password_hash': self.password_hash,
                 'secure_folder': self.secure_folder,
                 'version': self.version,
-                'created_time': time.time()
+                'storage_mode': self.storage_mode,
+                'key_wrap': self.key_wrap,
+                'kdf': self.kdf,
+                'secure_delete': self.secure_delete,
             }
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=2)
-            self.hide_path(self.config_file)
+            if 'created_time' not in self.config_store.values:
+                config['created_time'] = time.time()
+            self.config_store.update(config)
         except Exception as e:
             print(f"Error saving config: {e}")
     
@@ -460,16 +2126,14 @@ class SecureFolderManager:
             self.root.quit()
             return
         
-        # Set password hash
-        self.password_hash = self.hash_password(password)
-        
         # Create secure folder in safe location
         self.secure_folder = self.get_safe_secure_directory()
         os.makedirs(self.secure_folder, exist_ok=True)
         self.hide_path(self.secure_folder)
         
-        # Save configuration
-        self.save_config()
+        # Set password hash and save configuration
+        self.set_password(password)
+        self.status_var.set("Folder is locked. Please enter password to unlock.")
         
         messagebox.showinfo("Success", 
                            f"Secure folder created successfully!\n\n"
@@ -484,12 +2148,28 @@ class SecureFolderManager:
             messagebox.showerror("Error", "Please enter a password.")
             return
         
-        if self.hash_password(password) == self.password_hash:
+        correct, wrapping_key = self.check_password(password)
+        if correct:
+            if self.key_wrap and AESGCM is not None:
+                try:
+                    # Keys sealed before the KDF settings existed carry their own scrypt salt
+                    if 'salt' in self.key_wrap:
+                        wrapping_key = derive_key(password, self.key_wrap)
+                    self.data_key = unwrap_data_key(self.key_wrap, wrapping_key)
+                except InvalidTag:
+                    messagebox.showerror("Error", "The encryption key could not be unlocked with this password.")
+                    return
+            self.wrapping_key = wrapping_key
+            if not self.kdf:
+                # Upgrade vaults still using plain SHA-256 to the salted KDF
+                self.set_password(password)
             self.is_unlocked = True
             self.unlock_btn.config(state="disabled")
             self.lock_btn.config(state="normal")
             self.password_entry.config(state="disabled")
             self.status_var.set("Folder unlocked. You can now view and manage your files.")
+            # Finish reclaiming anything deleted before the last exit
+            self.get_trash()
             self.refresh_files()
             messagebox.showinfo("Success", "Folder unlocked successfully!")
         else:
@@ -498,6 +2178,12 @@ class SecureFolderManager:
     
     def lock_folder(self):
         """Lock the secure folder"""
+        # Let a running import finish the files it is writing before the key goes away
+        if self.ingest is not None:
+            self.ingest.cancel()
+            self.ingest.join()
+            self.ingest = None
+        
         self.is_unlocked = False
         self.unlock_btn.config(state="normal")
         self.lock_btn.config(state="disabled")
@@ -506,8 +2192,22 @@ class SecureFolderManager:
         self.status_var.set("Folder is locked. Please enter password to unlock.")
         
         # Clear file tree
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.current_dir = ""
+        self.name_index = None
+        self.file_list.set_rows([])
+        self.explorer_frame.config(text="Secure Files")
+        
+        # Forget the encryption key
+        if self.cipher is not None:
+            self.cipher.close()
+        self.cipher = None
+        self.data_key = None
+        self.wrapping_key = None
+        
+        # Stop serving decrypted views of vault files
+        if self.stream_server is not None:
+            self.stream_server.close()
+            self.stream_server = None
         
         messagebox.showinfo("Success", "Folder locked successfully!")
     
@@ -516,27 +2216,66 @@ class SecureFolderManager:
         if not self.is_unlocked:
             return
         
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         if not os.path.exists(self.secure_folder):
             return
         
         # Add files and folders (including migrated folders)
         try:
-            for item in os.listdir(self.secure_folder):
-                item_path = os.path.join(self.secure_folder, item)
-                if os.path.isfile(item_path):
-                    size = self.format_size(os.path.getsize(item_path))
-                    modified = self.format_time(os.path.getmtime(item_path))
-                    self.tree.insert("", "end", text=item, values=(size, modified), tags=("file",))
-                elif os.path.isdir(item_path):
-                    modified = self.format_time(os.path.getmtime(item_path))
-                    self.tree.insert("", "end", text=f"📁 {item}", values=("Folder", modified), tags=("folder",))
+            rows = []
+            if self.current_dir:
+                rows.append(("..", "parent", 0, 0))
+            
+            # A single scandir pass, and only if the folder changed since it was indexed
+            index = self.get_vault_index()
+            index.reconcile(self.current_dir)
+            for item, is_dir, size, mtime in index.list_dir(self.current_dir):
+                if is_dir:
+                    rows.append((item, "folder", size, mtime))
+                elif item.endswith(ChunkedCipher.SUFFIX):
+                    rows.append((item, "encrypted", size, mtime))
+                else:
+                    rows.append((item, "file", size, mtime))
+            
+            # Files kept in the deduplicating block store
+            store = self.get_block_store()
+            for rel_path, entry in store.files.items():
+                if os.path.dirname(rel_path) == self.current_dir:
+                    rows.append((os.path.basename(rel_path), "stored", entry['size'], entry['mtime']))
+            
+            rows.sort(key=lambda row: (row[1] not in ("parent", "folder"), row[0].lower()))
+            self.file_list.set_rows(rows)
+            self.name_index = NameIndex(self.display_name(row[0], row[1]) for row in rows if row[1] != "parent")
+            
+            location = "/".join(self.current_dir.split(os.sep)) if self.current_dir else ""
+            self.explorer_frame.config(text=f"Secure Files / {location}" if location else "Secure Files")
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing files: {e}")
     
+    def format_row(self, row):
+        """Turn a file list row into Treeview text, values and tags"""
+        name, kind, size, mtime = row
+        if kind == "parent":
+            return "⬆ ..", ("", ""), ("folder",)
+        if kind == "folder":
+            return f"📁 {name}", ("Folder", self.format_time(mtime)), ("folder",)
+        if kind == "encrypted":
+            return f"🔒 {self.display_name(name, kind)}", (self.format_size(size), self.format_time(mtime)), ("file", kind)
+        return name, (self.format_size(size), self.format_time(mtime)), ("file", kind)
+    
+    def display_name(self, name, kind):
+        """Name shown to the user for an entry stored on disk as name"""
+        if kind == "encrypted":
+            return name[:-len(ChunkedCipher.SUFFIX)]
+        return name
+    
+    def change_directory(self, rel_dir):
+        """Browse into another folder of the vault"""
+        self.current_dir = rel_dir
+        self.name_index = None
+        self.file_list.offset = 0
+        self.file_list.selected_keys = set()
+        self.refresh_files()
+    
     def format_size(self, size):
         """Format file size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -545,6 +2284,15 @@ class SecureFolderManager:
             size /= 1024.0
         return f"{size:.1f} TB"
     
+    def format_duration(self, seconds):
+        """Format a remaining time such as 1 h 05 min or 42 s"""
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+        if seconds >= 60:
+            return f"{seconds // 60} min {seconds % 60:02d} s"
+        return f"{seconds} s"
+    
     def format_time(self, timestamp):
         """Format timestamp to readable format"""
         return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
@@ -560,22 +2308,40 @@ class SecureFolderManager:
             self.context_menu.grab_release()
     
     def open_file(self, event=None):
-        """Open selected file"""
+        """Open selected file, or browse into the selected folder"""
         if not self.is_unlocked:
             return
         
-        selection = self.tree.selection()
+        selection = self.file_list.selected_rows()
         if not selection:
             return
         
-        item = selection[0]
-        filename = self.tree.item(item)["text"]
-        if filename.startswith("📁 "):
-            filename = filename[2:]  # Remove folder emoji
+        filename, kind = selection[0][:2]
+        if kind == "parent":
+            self.change_directory(os.path.dirname(self.current_dir))
+            return
+        
+        rel_path = os.path.join(self.current_dir, filename)
+        file_path = os.path.join(self.secure_folder, rel_path)
+        
+        if kind == "folder":
+            self.change_directory(rel_path)
+            return
         
-        file_path = os.path.join(self.secure_folder, filename)
+        if kind in ("stored", "encrypted"):
+            try:
+                # Stream the file to the viewer without writing a plaintext copy
+                server = self.get_stream_server()
+                if kind == "stored":
+                    reader = BlockFileReader(self.get_block_store(), rel_path, server.cache)
+                else:
+                    reader = EncryptedFileReader(file_path, self.get_cipher(), server.cache)
+                file_path = server.publish(reader, self.display_name(filename, kind))
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not open file: {e}")
+                return
         
-        if os.path.isfile(file_path):
+        if kind in ("stored", "encrypted") or os.path.isfile(file_path):
             try:
                 if platform.system() == "Windows":
                     os.startfile(file_path)
@@ -585,38 +2351,80 @@ class SecureFolderManager:
                     subprocess.run(["xdg-open", file_path])
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open file: {e}")
-        elif os.path.isdir(file_path):
-            # Show info about existing folders (migrated from Gen 1)
-            messagebox.showinfo("Folder Info", 
-                              f"This folder was migrated from Gen 1.\n"
-                              f"Folder navigation is not implemented in Gen 2 for security reasons.\n"
-                              f"You can access individual files using your system's file manager if needed.")
     
     def delete_file(self):
-        """Delete selected file"""
+        """Delete the selected files and folders"""
         if not self.is_unlocked:
             return
         
-        selection = self.tree.selection()
+        selection = [row for row in self.file_list.selected_rows() if row[1] != "parent"]
         if not selection:
             return
         
-        item = selection[0]
-        filename = self.tree.item(item)["text"]
-        if filename.startswith("📁 "):
-            filename = filename[2:]  # Remove folder emoji
+        if len(selection) == 1:
+            question = f"Are you sure you want to delete '{self.display_name(*selection[0][:2])}'?"
+        else:
+            question = f"Are you sure you want to delete {len(selection)} items?"
+        if not messagebox.askyesno("Confirm Delete", question):
+            return
         
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete '{filename}'?"):
-            file_path = os.path.join(self.secure_folder, filename)
+        store = self.get_block_store()
+        trash = self.get_trash()
+        trashed = []
+        manifest_changed = False
+        deleted = set()
+        failures = []
+        for filename, kind in (row[:2] for row in selection):
+            rel_path = os.path.join(self.current_dir, filename)
             try:
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-                self.refresh_files()
-                messagebox.showinfo("Success", f"'{filename}' deleted successfully!")
+                if kind == "stored":
+                    store.remove(rel_path, save=False)
+                    manifest_changed = True
+                else:
+                    # An atomic rename; the contents are reclaimed in the background
+                    trash.discard(rel_path)
+                    trashed.append(rel_path)
+                    if kind == "folder":
+                        prefix = rel_path + os.sep
+                        for name in [name for name in store.files if name.startswith(prefix)]:
+                            store.remove(name, save=False)
+                            manifest_changed = True
+                deleted.add(filename)
             except Exception as e:
-                messagebox.showerror("Error", f"Could not delete file: {e}")
+                failures.append(f"{self.display_name(filename, kind)}: {e}")
+        
+        if manifest_changed:
+            with store.lock:
+                store.save()
+        if trashed:
+            self.get_vault_index().remove(trashed)
+        
+        # Update the list in place instead of listing the folder again
+        self.file_list.remove_rows(deleted)
+        if self.name_index is not None:
+            for filename, kind in (row[:2] for row in selection):
+                if filename in deleted:
+                    self.name_index.release(self.display_name(filename, kind))
+        self.status_var.set(f"Deleted {len(deleted)} item(s).")
+        
+        if failures:
+            failed = "\n".join(failures[:10])
+            if len(failures) > 10:
+                failed += f"\n... and {len(failures) - 10} more"
+            messagebox.showerror("Error", f"Could not delete {len(failures)} item(s):\n{failed}")
+    
+    def get_trash(self):
+        """Return the trash of the current secure folder, reclaiming leftovers on first use"""
+        if self.trash is None or self.trash.root != self.secure_folder:
+            self.trash = VaultTrash(self.secure_folder, self.secure_delete)
+        return self.trash
+    
+    def set_secure_delete(self, enabled):
+        """Overwrite file contents before they are removed from disk"""
+        self.secure_delete = enabled
+        if self.trash is not None:
+            self.trash.secure_overwrite = enabled
+        self.save_config()
     
     def add_files(self):
         """Add files to secure folder"""
@@ -625,37 +2433,211 @@ class SecureFolderManager:
             return
         
         files = filedialog.askopenfilenames(title="Select files to add")
-        for file_path in files:
-            self.copy_to_secure_folder(file_path)
-        
         if files:
-            self.refresh_files()
-            messagebox.showinfo("Success", f"{len(files)} file(s) added successfully!")
+            self.start_ingest(files)
     
-    def copy_to_secure_folder(self, source_path):
-        """Copy file to secure folder"""
+    def add_folder(self):
+        """Add a folder and everything below it to secure folder"""
+        if not self.is_unlocked:
+            messagebox.showwarning("Access Denied", "Please unlock the folder first.")
+            return
+        
+        folder = filedialog.askdirectory(title="Select folder to add")
+        if folder:
+            self.start_ingest([folder])
+    
+    def start_ingest(self, sources):
+        """Import files and folders in the background with a progress dialog"""
+        if self.ingest is not None:
+            messagebox.showwarning("Import Running", "Please wait for the current import to finish.")
+            return
+        
+        mode = self.storage_mode
         try:
-            filename = os.path.basename(source_path)
-            dest_path = os.path.join(self.secure_folder, filename)
-            
-            # Handle name conflicts
-            counter = 1
-            base_name, ext = os.path.splitext(filename)
-            while os.path.exists(dest_path):
-                if ext:
-                    new_name = f"{base_name}_{counter}{ext}"
-                else:
-                    new_name = f"{base_name}_{counter}"
-                dest_path = os.path.join(self.secure_folder, new_name)
-                counter += 1
+            if mode == "encrypted":
+                self.get_cipher()
+            targets = [(source_path, self.claim_target(source_path, mode)) for source_path in sources]
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not add files: {e}")
+            return
+        
+        engine = IngestPipeline(
+            targets, self.secure_folder, lambda source_path, rel_path: self.store_file(source_path, rel_path, mode),
+            index=self.get_vault_index(), block_store=self.get_block_store() if mode == "dedup" else None)
+        self.ingest = engine
+        
+        # The dialog is not modal, so the vault can be browsed while files are imported
+        progress_window = tk.Toplevel(self.root)
+        progress_window.title("Adding Files...")
+        progress_window.geometry("420x160")
+        progress_window.transient(self.root)
+        
+        progress_var = tk.DoubleVar()
+        ttk.Progressbar(progress_window, variable=progress_var, maximum=100).pack(pady=(15, 5), padx=20, fill='x')
+        
+        status_label = ttk.Label(progress_window, text="Scanning...")
+        status_label.pack(pady=5)
+        rate_label = ttk.Label(progress_window, text="")
+        rate_label.pack(pady=5)
+        
+        cancel_btn = ttk.Button(progress_window, text="Cancel", command=engine.cancel)
+        cancel_btn.pack(pady=5)
+        progress_window.protocol("WM_DELETE_WINDOW", engine.cancel)
+        
+        def poll_progress():
+            try:
+                kind, value, total = engine.progress_queue.get_nowait()
+            except queue.Empty:
+                completed, total, completed_bytes, total_bytes, rate, eta = engine.status()
+                progress_var.set((completed_bytes / total_bytes) * 100 if total_bytes else 0)
+                found = "" if engine.scanning else f"/{total}"
+                status_label.config(text=f"Added {completed}{found} files "
+                                         f"({self.format_size(completed_bytes)} of {self.format_size(total_bytes)})")
+                remaining = "estimating..." if eta is None else f"{self.format_duration(eta)} left"
+                rate_label.config(text=f"{self.format_size(rate)}/s, {remaining}")
+                if engine.cancel_event.is_set():
+                    cancel_btn.config(state="disabled", text="Cancelling...")
+                progress_window.after(200, poll_progress)
+                return
             
-            if os.path.isfile(source_path):
-                shutil.copy2(source_path, dest_path)
+            progress_window.destroy()
+            if self.ingest is not engine:
+                # The folder was locked while importing
+                return
+            self.ingest = None
+            self.refresh_files()
+            self.report_ingest(engine, kind, value)
+        
+        engine.start()
+        poll_progress()
+    
+    def report_ingest(self, engine, kind, value):
+        """Show one summary of an import, including every failure"""
+        if kind == 'error':
+            messagebox.showerror("Error", f"Import stopped: {value}")
+            return
+        summary = f"{engine.completed} file(s) added successfully!"
+        if kind == 'cancelled':
+            summary = f"Import cancelled. {engine.completed} of {engine.total} file(s) were added."
+        if not engine.failures:
+            messagebox.showinfo("Success" if kind == 'done' else "Import Cancelled", summary)
+            return
+        failed = "\n".join(f"{path}: {error}" for path, error in engine.failures[:10])
+        if len(engine.failures) > 10:
+            failed += f"\n... and {len(engine.failures) - 10} more"
+        messagebox.showwarning("Import Incomplete",
+                               f"{summary}\n{len(engine.failures)} item(s) could not be added:\n{failed}")
+    
+    def get_block_store(self):
+        """Return the deduplicating block store of the current secure folder"""
+        if self.block_store is None or self.block_store.root != self.secure_folder:
+            self.block_store = BlockStore(self.secure_folder, self.get_trash())
+            self.name_index = None
+        return self.block_store
+    
+    def get_vault_index(self):
+        """Return the persistent file index of the current secure folder"""
+        if self.vault_index is None or self.vault_index.root != self.secure_folder:
+            if self.vault_index is not None:
+                self.vault_index.close()
+            self.vault_index = VaultIndex(self.index_file, self.secure_folder, self.reserved_names)
+        return self.vault_index
+    
+    def get_name_index(self):
+        """Return the index of names in use in the current folder, built from the vault index"""
+        store = self.get_block_store()
+        if self.name_index is None:
+            index = self.get_vault_index()
+            index.reconcile(self.current_dir)
+            names = [self.display_name(name, "encrypted" if not is_dir and name.endswith(ChunkedCipher.SUFFIX) else "file")
+                     for name, is_dir, size, mtime in index.list_dir(self.current_dir)]
+            names += [os.path.basename(rel_path) for rel_path in store.files
+                      if os.path.dirname(rel_path) == self.current_dir]
+            self.name_index = NameIndex(names)
+        return self.name_index
+    
+    def show_storage_mode(self):
+        """Reflect the current storage mode in the selector"""
+        for label, mode in self.storage_modes.items():
+            if mode == self.storage_mode:
+                self.storage_mode_var.set(label)
+    
+    def set_storage_mode(self, mode):
+        """Switch how newly added files are stored"""
+        if mode == "encrypted" and not self.enable_encryption():
+            self.show_storage_mode()
+            return
+        self.storage_mode = mode
+        self.save_config()
+    
+    def enable_encryption(self):
+        """Make sure the data key is available, creating it on first use"""
+        if AESGCM is None:
+            if messagebox.askyesno("Encryption",
+                                   "Encrypted storage requires the 'cryptography' package.\n"
+                                   "Install it now? The application will restart."):
+                install_and_restart("cryptography")
+            return False
+        if self.data_key is not None:
+            return True
+        if not self.is_unlocked or self.wrapping_key is None:
+            messagebox.showwarning("Access Denied", "Please unlock the folder first.")
+            return False
+        
+        if self.key_wrap:
+            self.data_key = unwrap_data_key(self.key_wrap, self.wrapping_key)
+        else:
+            self.data_key = AESGCM.generate_key(bit_length=256)
+            self.key_wrap = wrap_data_key(self.data_key, self.wrapping_key)
+            self.save_config()
+        return True
+    
+    def get_stream_server(self):
+        """Return the loopback server used to view encrypted and deduplicated files"""
+        if self.stream_server is None:
+            self.stream_server = VaultStreamServer()
+        return self.stream_server
+    
+    def get_cipher(self):
+        """Return the cipher for encrypted files, once the data key is unlocked"""
+        if self.cipher is None:
+            if AESGCM is None or self.data_key is None:
+                raise RuntimeError("Encrypted storage is not available. Install the 'cryptography' package.")
+            self.cipher = ChunkedCipher(self.data_key)
+        return self.cipher
+    
+    def claim_target(self, source_path, mode):
+        """Reserve a free name in the current folder for a file or folder being added"""
+        name_index = self.get_name_index()
+        basename = os.path.basename(os.path.normpath(source_path))
+        is_dir = os.path.isdir(source_path)
+        suffix = ChunkedCipher.SUFFIX if mode == "encrypted" and not is_dir else ""
+        filename = name_index.claim(basename)
+        # Entries created outside the application may not be in the index yet
+        if is_dir or mode != "dedup":
+            while os.path.lexists(os.path.join(self.secure_folder, self.current_dir, filename + suffix)):
+                filename = name_index.claim(basename)
+        return os.path.join(self.current_dir, filename)
+    
+    def store_file(self, source_path, rel_path, mode):
+        """Store one file at rel_path; returns the path to index, if any. Runs on import workers"""
+        if mode == "dedup":
+            self.get_block_store().add(rel_path, source_path, save=False)
+            return None
+        
+        suffix = ChunkedCipher.SUFFIX if mode == "encrypted" else ""
+        dest_path = os.path.join(self.secure_folder, rel_path + suffix)
+        try:
+            if suffix:
+                self.get_cipher().encrypt_file(source_path, dest_path)
             else:
-                raise ValueError("Only files can be added in Gen 2")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not copy '{source_path}': {e}")
+                fast_copy_file(source_path, dest_path)
+        except BaseException:
+            # Never leave a partial copy behind
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise
+        return rel_path + suffix
     
     def change_password(self):
         """Change the folder password"""
@@ -663,8 +2645,13 @@ class SecureFolderManager:
             messagebox.showwarning("Access Denied", "Please unlock the folder first.")
             return
         
+        if self.key_wrap and self.data_key is None:
+            messagebox.showerror("Error", "Install the 'cryptography' package before changing the password "
+                                          "of a folder that contains encrypted files.")
+            return
+        
         current_password = simpledialog.askstring("Current Password", "Enter current password:", show="*")
-        if not current_password or self.hash_password(current_password) != self.password_hash:
+        if not current_password or not self.check_password(current_password)[0]:
             messagebox.showerror("Error", "Incorrect current password!")
             return
         
@@ -677,8 +2664,8 @@ class SecureFolderManager:
             messagebox.showerror("Error", "Passwords do not match!")
             return
         
-        self.password_hash = self.hash_password(new_password)
-        self.save_config()
+        self.set_password(new_password)
+        self.status_var.set("Folder unlocked. You can now view and manage your files.")
         messagebox.showinfo("Success", "Password changed successfully!")
     
     def run(self):
@@ -694,5 +2681,15 @@ class SecureFolderManager:
         self.root.quit()
 
 if __name__ == "__main__":
+    if "--benchmark-migration" in sys.argv:
+        benchmark_migration()
+        sys.exit(0)
+    if "--calibrate-kdf" in sys.argv:
+        benchmark_kdf()
+        sys.exit(0)
+    if "--benchmark-encryption" in sys.argv:
+        sizes = sys.argv[sys.argv.index("--benchmark-encryption") + 1:]
+        benchmark_encryption(sizes or ("1M", "16M", "256M"))
+        sys.exit(0)
     app = SecureFolderManager()
     app.run()
\ No newline at end of file
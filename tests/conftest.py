@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(relative_path, name, requires=()):
+    """Import one of the scripts, whose file names are not valid module names"""
+    for module in requires:
+        pytest.importorskip(module)
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def secure_folder():
+    return load_script(os.path.join("secure folder creater", "Secure Folder Gen2.py"), "secure_folder_gen2",
+                       requires=("tkinter",))
+
+
+@pytest.fixture(scope="session")
+def focus_mode():
+    return load_script(os.path.join("InstagramFocusMode", "InstaFocusMode.py"), "insta_focus_mode",
+                       requires=("psutil", "PIL"))
+
+
+@pytest.fixture(scope="session")
+def scraper():
+    return load_script(os.path.join("Telegram-Scraper", "Telegram Chat Scraper.py"), "telegram_chat_scraper",
+                       requires=("selenium",))
@@ -0,0 +1,147 @@
+import contextlib
+
+import psutil
+import pytest
+
+
+def test_aho_corasick_finds_all_keywords(focus_mode):
+    matcher = focus_mode.AhoCorasick([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert matcher.search("ushers") == {1, 2, 4}
+    assert matcher.search("this") == {3}
+    assert matcher.search("nothing") == set()
+
+
+def test_aho_corasick_ignores_case_and_overlaps(focus_mode):
+    matcher = focus_mode.AhoCorasick([("instagram", "ig"), ("gram", "g"), ("a", "a")])
+    assert matcher.search("INSTAGRAM - Google Chrome") == {"ig", "g", "a"}
+
+
+def test_aho_corasick_skips_empty_keywords(focus_mode):
+    matcher = focus_mode.AhoCorasick([("", 1), ("steam", 2)])
+    assert matcher.search("Terminal") == set()
+    assert matcher.search("steamwebhelper") == {2}
+
+
+def test_aho_corasick_matches_like_substring_search(focus_mode):
+    keywords = ["ab", "bab", "abc", "c", "bca", "aaa"]
+    matcher = focus_mode.AhoCorasick((keyword, keyword) for keyword in keywords)
+    for text in ["abcabab", "aaaa", "cbca", "bbbb", ""]:
+        assert matcher.search(text) == {keyword for keyword in keywords if keyword in text}
+
+
+LEVELS = [{"cooldown": 100, "auto_dismiss": 10},
+          {"cooldown": 50, "auto_dismiss": 20},
+          {"cooldown": 25, "auto_dismiss": 30}]
+
+
+@pytest.fixture
+def scheduler(focus_mode):
+    return focus_mode.InterventionScheduler(confirm_checks=2, release_seconds=5, reset_seconds=300,
+                                            levels=LEVELS)
+
+
+def test_scheduler_waits_for_confirmation(scheduler):
+    assert scheduler.update(True, 0) is None
+    assert scheduler.update(True, 1) == {"level": 0, "auto_dismiss": 10}
+    assert scheduler.state == scheduler.INTERVENING
+    assert scheduler.episodes == 1
+
+
+def test_scheduler_cools_down_then_escalates(scheduler):
+    scheduler.update(True, 0)
+    scheduler.update(True, 1)
+    scheduler.dismissed(3)
+    assert scheduler.state == scheduler.COOLDOWN
+    # Still there, but within the level 0 cooldown
+    assert scheduler.update(True, 50) is None
+    assert scheduler.update(True, 103) == {"level": 1, "auto_dismiss": 20}
+    scheduler.dismissed(110)
+    assert scheduler.update(True, 159) is None
+    assert scheduler.update(True, 160) == {"level": 2, "auto_dismiss": 30}
+    scheduler.dismissed(161)
+    # The last level repeats
+    assert scheduler.update(True, 186) == {"level": 2, "auto_dismiss": 30}
+    assert scheduler.episodes == 1
+
+
+def test_scheduler_ignores_short_absences(scheduler):
+    scheduler.update(True, 0)
+    scheduler.update(True, 1)
+    scheduler.dismissed(2)
+    scheduler.update(False, 3)
+    scheduler.update(True, 4)
+    assert scheduler.episodes == 1
+    scheduler.update(False, 20)
+    assert not scheduler.present
+    scheduler.update(True, 21)
+    scheduler.update(True, 22)
+    assert scheduler.episodes == 2
+
+
+def test_scheduler_resets_level_after_long_absence(scheduler):
+    scheduler.update(True, 0)
+    scheduler.update(True, 1)
+    scheduler.dismissed(2)
+    assert scheduler.level == 1
+    scheduler.update(False, 10)
+    scheduler.update(True, 400)
+    assert scheduler.update(True, 401) == {"level": 0, "auto_dismiss": 10}
+
+
+def test_scheduler_times_out_unreported_dismissal(scheduler):
+    scheduler.update(True, 0)
+    scheduler.update(True, 1)
+    scheduler.update(True, 1 + 10 + scheduler.DISMISS_GRACE)
+    assert scheduler.state == scheduler.COOLDOWN
+    assert scheduler.level == 1
+
+
+class FakeProcess:
+    def __init__(self, table, pid):
+        self.table = table
+        self.pid = pid
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def name(self):
+        if self.pid not in self.table:
+            raise psutil.NoSuchProcess(self.pid)
+        return self.table[self.pid][1]
+
+    def create_time(self):
+        if self.pid not in self.table:
+            raise psutil.NoSuchProcess(self.pid)
+        return self.table[self.pid][0]
+
+
+class FakeProcesses:
+    def __init__(self, table):
+        self.table = table
+
+    def pids(self):
+        return list(self.table)
+
+    def Process(self, pid):
+        return FakeProcess(self.table, pid)
+
+    def process_iter(self, attrs):
+        for pid in list(self.table):
+            proc = FakeProcess(self.table, pid)
+            proc.info = {"create_time": proc.create_time()}
+            yield proc
+
+
+def test_process_tracker_notices_reused_pid(focus_mode):
+    table = {7: (1.0, "bash"), 8: (1.0, "code")}
+    tracker = focus_mode.ProcessTracker(focus_mode.RuleSet.default().match_process, FakeProcesses(table))
+    assert tracker.scan() == set()
+    table[7] = (2.0, "Instagram")
+    assert tracker.scan() == {0}
+    table[7] = (3.0, "bash")
+    assert tracker.scan() == set()
+    del table[7]
+    tracker.scan()
+    assert 7 not in tracker.cache
+    # Only new processes are looked at
+    assert tracker.examined == 4
@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def block_store(secure_folder, tmp_path, monkeypatch):
+    monkeypatch.setattr(secure_folder.BlockStore, "CHUNK_SIZE", 4)
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    return secure_folder.BlockStore(str(vault))
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def chunk_files(store):
+    return sorted(name for _, _, names in os.walk(store.blocks_dir) for name in names)
+
+
+def test_block_store_shares_identical_chunks(block_store, tmp_path):
+    block_store.add("a", write(tmp_path, "a", b"aaaabbbbcc"))
+    block_store.add("b", write(tmp_path, "b", b"aaaazz"))
+    assert sorted(block_store.refcounts.values()) == [1, 1, 1, 2]
+    assert block_store.stored_bytes == 12
+    assert len(chunk_files(block_store)) == 4
+
+
+def test_block_store_remove_keeps_chunks_until_saved(block_store, tmp_path):
+    block_store.add("a", write(tmp_path, "a", b"aaaabbbbcc"))
+    block_store.add("b", write(tmp_path, "b", b"aaaazz"))
+    block_store.remove("a", save=False)
+    # The saved manifest still lists "a", so its chunks must still be there
+    assert len(chunk_files(block_store)) == 4
+    with open(block_store.manifest_path) as f:
+        assert "a" in json.load(f)["files"]
+
+    block_store.save()
+    assert len(chunk_files(block_store)) == 2
+    assert block_store.stored_bytes == 6
+    reloaded = type(block_store)(block_store.root)
+    assert reloaded.refcounts == block_store.refcounts
+
+
+def test_block_store_keeps_chunk_stored_again_before_save(block_store, tmp_path):
+    source = write(tmp_path, "a", b"aaaa")
+    block_store.add("a", source)
+    block_store.remove("a", save=False)
+    block_store.add("again", source)
+    assert len(chunk_files(block_store)) == 1
+
+
+def test_block_store_add_rolls_back_on_failure(block_store, tmp_path, monkeypatch):
+    block_store.add("b", write(tmp_path, "b", b"aaaazz"))
+    write_chunk = block_store.write_chunk
+    calls = []
+
+    def failing_write(digest, data):
+        calls.append(digest)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        write_chunk(digest, data)
+
+    monkeypatch.setattr(block_store, "write_chunk", failing_write)
+    with pytest.raises(OSError):
+        block_store.add("a", write(tmp_path, "a", b"aaaabbbbcc"))
+    assert "a" not in block_store.files
+    assert sorted(block_store.refcounts.values()) == [1, 1]
+    block_store.save()
+    assert len(chunk_files(block_store)) == 2
+
+
+def test_block_store_writes_chunks_outside_the_lock(block_store, tmp_path, monkeypatch):
+    source = write(tmp_path, "a", b"aaaa")
+    write_chunk = block_store.write_chunk
+    writing = threading.Event()
+    release = threading.Event()
+
+    def stalled_write(digest, data):
+        if threading.current_thread() is not threading.main_thread():
+            writing.set()
+            waits.append(release.wait(5))
+            raise OSError("disk full")
+        write_chunk(digest, data)
+
+    monkeypatch.setattr(block_store, "write_chunk", stalled_write)
+    waits = []
+    errors = []
+
+    def add_failing():
+        try:
+            block_store.add("first", source)
+        except OSError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=add_failing)
+    thread.start()
+    assert writing.wait(5)
+    # The first writer is still busy: the lock is free and the chunk is pending,
+    # so this add stores the chunk itself instead of trusting the other one
+    block_store.add("second", source)
+    release.set()
+    thread.join(5)
+    assert waits == [True] and errors
+    assert list(block_store.files) == ["second"]
+    assert block_store.refcounts == {block_store.files["second"]["chunks"][0]: 1}
+    assert len(chunk_files(block_store)) == 1
+
+
+def test_vault_trash_names_concurrent_discards_apart(secure_folder, tmp_path, monkeypatch):
+    for i in range(200):
+        (tmp_path / f"file{i}").write_bytes(b"x")
+    trash = secure_folder.VaultTrash(str(tmp_path))
+    monkeypatch.setattr(trash, "start", lambda: None)
+    # Every discard in the same nanosecond: only the counter tells them apart
+    monkeypatch.setattr(secure_folder.time, "time_ns", lambda: 1)
+    threads = [threading.Thread(target=lambda i=i: trash.discard(f"file{i}")) for i in range(200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(os.listdir(trash.trash_dir)) == 200
+    assert trash.pending.qsize() == 200
+
+
+@pytest.fixture
+def cipher(secure_folder):
+    if secure_folder.AESGCM is None:
+        pytest.skip("cryptography is not installed")
+    cipher = secure_folder.ChunkedCipher(secure_folder.AESGCM.generate_key(bit_length=256),
+                                         workers=2, chunk_size=16)
+    yield cipher
+    cipher.close()
+
+
+@pytest.mark.parametrize("size", [0, 1, 16, 17, 100])
+def test_chunked_cipher_round_trip(cipher, tmp_path, size):
+    plain = write(tmp_path, "plain", os.urandom(size))
+    sealed, restored = str(tmp_path / "sealed"), str(tmp_path / "restored")
+    cipher.encrypt_file(plain, sealed)
+    cipher.decrypt_file(sealed, restored)
+    with open(plain, 'rb') as a, open(restored, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_chunked_cipher_decrypts_single_chunk(cipher, tmp_path):
+    data = bytes(range(100))
+    sealed = str(tmp_path / "sealed")
+    cipher.encrypt_file(write(tmp_path, "plain", data), sealed)
+    with open(sealed, 'rb') as f:
+        assert cipher.decrypt_chunk(f, 2) == data[32:48]
+
+
+def test_chunked_cipher_detects_truncation(secure_folder, cipher, tmp_path):
+    sealed = str(tmp_path / "sealed")
+    cipher.encrypt_file(write(tmp_path, "plain", os.urandom(40)), sealed)
+    with open(sealed, 'rb') as f:
+        data = f.read()
+    header = cipher.HEADER
+    magic, chunk_size, size, prefix = header.unpack(data[:header.size])
+
+    # Last chunk cut off, header unchanged
+    with open(sealed, 'wb') as f:
+        f.write(data[:-10])
+    with pytest.raises(secure_folder.InvalidTag):
+        cipher.decrypt_file(sealed, str(tmp_path / "out"))
+
+    # Last chunk dropped and the size in the header rewritten to match
+    with open(sealed, 'wb') as f:
+        f.write(header.pack(magic, chunk_size, 32, prefix) + data[header.size:header.size + 2 * (16 + 16)])
+    with pytest.raises(secure_folder.InvalidTag):
+        cipher.decrypt_file(sealed, str(tmp_path / "out"))
+
+
+def test_config_store_appends_and_compacts(secure_folder, tmp_path):
+    path = str(tmp_path / "config.log")
+    store = secure_folder.ConfigStore(path)
+    store.load()
+    store.update({"theme": "dark", "count": 0})
+    store.update({"theme": "dark"})
+    with open(path) as f:
+        # The first write is a snapshot; unchanged settings are not written again
+        assert len(f.readlines()) == 1
+    for count in range(1, store.COMPACT_LINES):
+        store.update({"count": count})
+    with open(path) as f:
+        assert len(f.readlines()) == store.COMPACT_LINES
+    store.update({"count": store.COMPACT_LINES})
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+
+    reloaded = secure_folder.ConfigStore(path)
+    assert reloaded.load() == {"theme": "dark", "count": store.COMPACT_LINES}
+
+
+def test_config_store_repairs_torn_line(secure_folder, tmp_path):
+    path = str(tmp_path / "config.log")
+    store = secure_folder.ConfigStore(path)
+    store.load()
+    store.update({"a": 1})
+    store.update({"b": 2})
+    with open(path, 'a') as f:
+        f.write('{"c": ')
+
+    reloaded = secure_folder.ConfigStore(path)
+    assert reloaded.load() == {"a": 1, "b": 2}
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    reloaded.update({"c": 3})
+    assert secure_folder.ConfigStore(path).load() == {"a": 1, "b": 2, "c": 3}
+
+
+def test_config_store_upgrades_plain_json(secure_folder, tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"secure_folder": "/vault"}))
+    assert secure_folder.ConfigStore(str(path)).load() == {"secure_folder": "/vault"}
+    assert json.loads(path.read_text())["format"] == secure_folder.ConfigStore.FORMAT
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 100)),
+    ("bytes=10-19", (10, 20)),
+    ("bytes=90-", (90, 100)),
+    ("bytes=50-500", (50, 100)),
+    ("bytes=-10", (90, 100)),
+    ("bytes=-500", (0, 100)),
+    # Invalid headers are ignored: the whole file is sent
+    ("bytes=9-3", (0, 100)),
+    ("bytes=a-b", (0, 100)),
+    ("bytes=--5", (0, 100)),
+    ("bytes=-", (0, 100)),
+    ("items=0-1", (0, 100)),
+    # Several ranges are not handled, so the whole file is sent
+    ("bytes=0-1,5-6", (0, 100)),
+    # Valid but unsatisfiable
+    ("bytes=100-", None),
+    ("bytes=200-300", None),
+    ("bytes=-0", None),
+])
+def test_parse_byte_range(secure_folder, header, expected):
+    assert secure_folder.parse_byte_range(header, 100) == expected
@@ -0,0 +1,147 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+MESSAGES = [
+    ("101", {"date": "June 1", "sender": "Admin", "timestamp": 1717200000, "text": "Lecture notes uploaded"}),
+    ("102", {"date": "June 1", "sender": None, "timestamp": None, "text": 'Quotes "and", commas\nand lines'}),
+    ("103", {"date": "June 2", "text": "per-element rows have no sender"}),
+]
+
+
+def export(scraper, path, messages=MESSAGES):
+    sink = scraper.open_sink(str(path))
+    for mid, message in messages:
+        sink.write(mid, dict(message))
+    sink.close()
+
+
+def test_jsonl_sink(scraper, tmp_path):
+    path = tmp_path / "chat.jsonl"
+    export(scraper, path)
+    rows = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert rows == [{"mid": mid, **message} for mid, message in MESSAGES]
+
+
+def test_csv_sink_writes_one_header(scraper, tmp_path):
+    path = tmp_path / "chat.csv"
+    export(scraper, path)
+    export(scraper, path, MESSAGES[:1])
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == scraper.MESSAGE_FIELDS
+    assert [row[0] for row in rows[1:]] == ["101", "102", "103", "101"]
+    assert rows[2][4] == 'Quotes "and", commas\nand lines'
+    assert rows[3][2:4] == ["", ""]
+
+
+def test_file_sink_syncs_periodically(scraper, tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(scraper.os, "fsync", synced.append)
+    sink = scraper.JsonlSink(str(tmp_path / "chat.jsonl"), sync_every=2)
+    for mid, message in MESSAGES:
+        sink.write(mid, message)
+    assert len(synced) == 1
+    sink.close()
+    assert len(synced) == 2
+
+
+def test_sqlite_sink_skips_duplicates_and_indexes_text(scraper, tmp_path):
+    path = tmp_path / "chat.db"
+    export(scraper, path)
+    export(scraper, path)
+    db = sqlite3.connect(str(path))
+    assert db.execute("SELECT count(*) FROM messages").fetchone() == (3,)
+    found = db.execute("SELECT mid FROM messages WHERE id IN "
+                       "(SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'lecture')").fetchall()
+    assert found == [("101",)]
+    db.close()
+
+
+def test_sqlite_sink_writes_in_batches(scraper, tmp_path):
+    sink = scraper.SqliteSink(str(tmp_path / "chat.db"), batch=2)
+    sink.write(*MESSAGES[0])
+    assert sink.pending
+    sink.write(*MESSAGES[1])
+    assert not sink.pending
+    sink.close()
+
+
+def test_open_sink_rejects_unknown_format(scraper, tmp_path):
+    with pytest.raises(ValueError):
+        scraper.open_sink(str(tmp_path / "chat.txt"))
+
+
+class FakeElement:
+    def __init__(self, page, kind):
+        self.page = page
+        self.generation = page.generation
+        self.kind = kind
+
+    def check(self):
+        if self.generation != self.page.generation:
+            raise self.page.scraper.StaleElementReferenceException(f"{self.kind} was replaced")
+
+    def find_element(self, by, value):
+        self.check()
+        return FakeElement(self.page, value)
+
+
+class FakeChatPage:
+    """A chat that loads one history page per scroll and is replaced by Telegram once"""
+
+    def __init__(self, scraper, pages, replace_on_drain):
+        self.scraper = scraper
+        self.pages = [[{"mid": str(mid), "date": "June 1", "sender": None, "timestamp": None,
+                        "text": f"message {mid}"} for mid in page] for page in pages]
+        self.rendered = self.pages.pop()
+        self.unread = list(self.rendered)
+        self.replace_on_drain = replace_on_drain
+        self.drains = 0
+        self.generation = 0
+        self.installs = 0
+
+    def find_element(self, by, value):
+        return FakeElement(self, value)
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_script(self, script, *args):
+        for element in args:
+            if isinstance(element, FakeElement):
+                element.check()
+        if script is self.scraper.INSTALL_CAPTURE_SCRIPT:
+            self.installs += 1
+        elif script is self.scraper.EXTRACT_SCRIPT:
+            rows, self.unread = self.unread, []
+            return json.dumps(rows)
+        elif script is self.scraper.HISTORY_STATE_SCRIPT:
+            return [0, self.rendered[0]["mid"]]
+        elif "scrollTop = 0" in script and self.pages:
+            page = self.pages.pop()
+            self.rendered = page + self.rendered
+            self.captured = page
+
+    def execute_async_script(self, script, *args):
+        self.drains += 1
+        rows, self.captured = getattr(self, "captured", []), []
+        if self.drains == self.replace_on_drain:
+            # The chat is rebuilt: the capture and every element handed out so far are gone,
+            # and the new chat shows the message that was arriving with it
+            self.generation += 1
+            self.unread = rows[:1]
+            return json.dumps({"rows": rows[1:], "pending": 0, "lost": True})
+        return json.dumps({"rows": rows, "pending": 0})
+
+
+def test_stream_capture_recovers_when_the_chat_is_replaced(scraper, monkeypatch):
+    history_end = scraper.HistoryEnd
+    monkeypatch.setattr(scraper, "HistoryEnd", lambda *args: history_end(*args, settle=0))
+    page = FakeChatPage(scraper, [[1, 2], [3, 4], [5, 6], [7, 8]], replace_on_drain=2)
+    data, seen = {}, set()
+    scraper.capture_chat(page, data, seen, {}, None, stream=True)
+    assert sorted(data, key=int) == [str(mid) for mid in range(1, 9)]
+    assert page.installs == 2